@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import networkx as nx
+import pandas as pd
+from Event_Scoring import EVENT_SCORES_FILE, load_event_scores, score_events
+from Game_Outcomes import aggregate_team_stats, determine_game_outcomes
+from Matchup_Graph import METRICS, ROLES, aggregate_matchups, build_matchup_graph
+from Player_Stats import accumulate_player_stats
+from Sparse_PageRank import ALPHA, MAX_ITER, normalize_and_consolidate_for_stat, rank_metrics
+from Synthetic_Data import SCALES, generate_events
+
+# Best times per scale and stage from a reference run, compared against on every run
+BASELINE_FILE = 'benchmark_baselines.json'
+
+# A stage is reported as a regression when it is this many times slower than its baseline
+REGRESSION_RATIO = 1.25
+
+# Slowdowns smaller than this are timer noise, whatever their ratio
+NOISE_SECONDS = 0.005
+
+# Timed runs per stage; the fastest is reported
+REPEAT = 3
+
+# Stages too slow to repeat at a scale are only timed once
+SINGLE_RUN_STAGES = {'networkx_pagerank'}
+
+
+# The hot paths of the pipeline, each as a function of the inputs the previous stages produce
+def benchmark_stages(events, event_scores):
+    scored = score_events(events, event_scores)
+    stats = {
+        role: pd.DataFrame({'player_id': scored[role].unique(), 'cumulative_wpa': 0.0, 'cumulative_re': 0.0,
+                            'cumulative_score': 0.0})
+        for role in ROLES
+    }
+    graph = build_matchup_graph(stats['batter']['player_id'].values, stats['pitcher']['player_id'].values,
+                                aggregate_matchups(scored))
+
+    def networkx_pagerank():
+        return {metric: nx.pagerank(normalize_and_consolidate_for_stat(graph, metric), alpha=ALPHA, weight='weight',
+                                    max_iter=MAX_ITER) for metric in METRICS}
+
+    return {
+        'score_events': lambda: score_events(events, event_scores),
+        'accumulate_player_stats': lambda: [accumulate_player_stats(scored, stats[role], role) for role in ROLES],
+        'determine_game_outcomes': lambda: aggregate_team_stats(determine_game_outcomes(scored)),
+        'build_matchup_graph': lambda: build_matchup_graph(stats['batter']['player_id'].values,
+                                                           stats['pitcher']['player_id'].values,
+                                                           aggregate_matchups(scored)),
+        'sparse_pagerank': lambda: rank_metrics(graph),
+        'networkx_pagerank': networkx_pagerank
+    }
+
+
+# Peak traced memory of one run, then the best wall time of `repeat` untraced runs
+def measure(function, repeat=REPEAT):
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times), peak
+
+
+def load_baselines(baseline_file=BASELINE_FILE):
+    if not os.path.exists(baseline_file):
+        return {}
+    with open(baseline_file) as f:
+        return json.load(f)
+
+
+def save_baselines(results, baseline_file=BASELINE_FILE):
+    baselines = load_baselines(baseline_file)
+    for row in results.itertuples(index=False):
+        baselines.setdefault(row.scale, {})[row.stage] = {'seconds': row.seconds, 'peak_mb': row.peak_mb}
+    with open(baseline_file, 'w') as f:
+        json.dump(baselines, f, indent=4, sort_keys=True)
+
+
+# Time every stage at every scale on generated events and compare against the stored baselines
+def run_benchmarks(scales=tuple(SCALES), repeat=REPEAT, seed=0, scores_file=EVENT_SCORES_FILE):
+    event_scores = load_event_scores(scores_file)
+    baselines = load_baselines()
+    results = []
+    for scale in scales:
+        events = generate_events(SCALES[scale], seed=seed)
+        print(f"{scale}: {len(events)} events")
+        for stage, function in benchmark_stages(events, event_scores).items():
+            seconds, peak = measure(function, 1 if stage in SINGLE_RUN_STAGES else repeat)
+            baseline = baselines.get(scale, {}).get(stage, {}).get('seconds')
+            results.append({
+                'scale': scale,
+                'stage': stage,
+                'events': len(events),
+                'seconds': round(seconds, 4),
+                'peak_mb': round(peak / 2 ** 20, 1),
+                'baseline_seconds': baseline,
+                'ratio': round(seconds / baseline, 2) if baseline else None
+            })
+
+    results = pd.DataFrame(results)
+    slowdown = results['seconds'] - results['baseline_seconds'].astype(float)
+    results['regression'] = (results['ratio'].astype(float) > REGRESSION_RATIO) & (slowdown > NOISE_SECONDS)
+    return results
+
+
+if __name__ == '__main__':
+    # python Benchmark.py [month|season|five_seasons ...] [--save], e.g. python Benchmark.py month season
+    arguments = sys.argv[1:]
+    scales = [argument for argument in arguments if argument in SCALES] or list(SCALES)
+    results = run_benchmarks(scales)
+    print(results.to_string(index=False))
+
+    if '--save' in arguments:
+        save_baselines(results)
+        print(f"Saved baselines to {BASELINE_FILE}")
+    elif results['regression'].any():
+        print(f"{results['regression'].sum()} stages are more than {REGRESSION_RATIO}x slower than their baselines")
+        sys.exit(1)
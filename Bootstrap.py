@@ -0,0 +1,94 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from Matchup_Graph import METRICS, ROLES, directed_matchup_matrix, load_matchup_graph
+from Sparse_PageRank import (ALPHA, TOLERANCE, power_iteration, rank_metrics, transition_matrix,
+                             uniform_personalization)
+from Storage import read_table, write_table
+
+# Replicates solved together in one block-diagonal power iteration
+BATCH_SIZE = 25
+
+# Percentiles reported for every player's interval
+INTERVAL = (2.5, 97.5)
+
+
+# Matchup totals per resampling unit: each game, or each plate appearance (one event row per plate appearance)
+def matchup_contributions(event_data, node_ids, unit='game'):
+    if unit == 'game':
+        contributions = event_data.groupby(['game_pk', 'batter', 'pitcher'])[list(METRICS.values())].sum()
+        contributions = contributions.reset_index()
+        unit_codes, units = pd.factorize(contributions['game_pk'])
+    else:
+        contributions = event_data.reset_index(drop=True)
+        unit_codes, units = np.arange(len(contributions)), contributions.index
+
+    return {
+        'unit': unit_codes,
+        'units': len(units),
+        'batter': np.searchsorted(node_ids, contributions['batter'].values),
+        'pitcher': np.searchsorted(node_ids, contributions['pitcher'].values),
+        **{metric: contributions[column].values.astype(np.float64) for metric, column in METRICS.items()}
+    }
+
+
+# Rank a batch of bootstrap replicates; each replicate draws the units with replacement and
+# every (replicate, metric) pair becomes one column of a single batched power iteration
+def rank_replicates(contributions, node_ids, replicates, seed, alpha=ALPHA, tol=TOLERANCE):
+    rng = np.random.default_rng(seed)
+    size = len(node_ids)
+
+    transitions, dangling, active = [], [], []
+    for _ in range(replicates):
+        draws = np.bincount(rng.integers(0, contributions['units'], contributions['units']),
+                            minlength=contributions['units'])
+        weights = draws[contributions['unit']]
+        graph = {metric: directed_matchup_matrix(contributions['batter'], contributions['pitcher'],
+                                                 contributions[metric] * weights, size) for metric in METRICS}
+        for metric in METRICS:
+            transition, metric_dangling, metric_active = transition_matrix(graph, metric)
+            transitions.append(transition)
+            dangling.append(metric_dangling)
+            active.append(metric_active)
+
+    personalization = uniform_personalization(np.column_stack(active))
+    x, _ = power_iteration(transitions, np.column_stack(dangling), personalization, alpha, tol)
+    return x.reshape(size, replicates, len(METRICS))
+
+
+# Bootstrap percentile intervals for every player's PageRank, with batches of replicates spread over a process pool
+def bootstrap_intervals(graph, event_data, replicates=200, unit='game', seed=0, alpha=ALPHA, max_workers=None):
+    node_ids = np.asarray(graph['node_ids'])
+    event_data = event_data[event_data['batter'].isin(node_ids) & event_data['pitcher'].isin(node_ids)]
+    contributions = matchup_contributions(event_data, node_ids, unit)
+
+    batches = [BATCH_SIZE] * (replicates // BATCH_SIZE) + ([replicates % BATCH_SIZE] if replicates % BATCH_SIZE else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        results = list(executor.map(rank_replicates, [contributions] * len(batches), [node_ids] * len(batches),
+                                    batches, seeds, [alpha] * len(batches)))
+    samples = np.concatenate(results, axis=1)
+
+    ranks, _ = rank_metrics(graph, alpha=alpha)
+    intervals = pd.DataFrame({'player_id': node_ids, 'role': np.asarray(ROLES)[np.asarray(graph['roles'])]})
+    for position, metric in enumerate(METRICS):
+        low, high = np.percentile(samples[:, :, position], INTERVAL, axis=1)
+        intervals[f'pagerank_{metric}'] = ranks[f'pagerank_{metric}'].values
+        intervals[f'pagerank_{metric}_low'] = low
+        intervals[f'pagerank_{metric}_high'] = high
+    return intervals
+
+
+if __name__ == '__main__':
+    # python Bootstrap.py [replicates] [game|plate_appearance]
+    replicates = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    unit = sys.argv[2] if len(sys.argv) > 2 else 'game'
+
+    event_data = read_table('event_data', columns=['game_pk', 'batter', 'pitcher', *METRICS.values()])
+    intervals = bootstrap_intervals(load_matchup_graph(), event_data, replicates, unit)
+    write_table(intervals, 'pagerank_intervals')
+    print(f"Saved {INTERVAL[0]}-{INTERVAL[1]} percentile intervals for {len(intervals)} players "
+          f"from {replicates} {unit} replicates")
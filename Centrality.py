@@ -0,0 +1,175 @@
+import sys
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from Matchup_Graph import METRICS, load_matchup_graph
+from Sparse_PageRank import (ALPHA, MAX_ITER, TOLERANCE, normalize_and_consolidate_for_stat, power_iteration,
+                             rank_metrics, transition_matrix)
+from Storage import read_table, write_table
+
+# Katz attenuation; the normalized graphs have a largest eigenvalue of at most 1, so any value below 1 converges
+KATZ_ALPHA = 0.1
+
+# HITS stops once the hub scores change by less than this in total, as nx.hits does
+HITS_TOLERANCE = 1.0e-8
+
+
+# Divide every column by its total, leaving all-zero columns at zero
+def scale_columns(x, totals):
+    return x / np.where(totals > 0, totals, 1)
+
+
+# The per-metric normalized graphs stacked block-diagonally, so one sparse product updates every metric at once,
+# and the players taking part in each metric's ranking
+def stacked_transitions(graph, metrics):
+    transitions, _, active = zip(*(transition_matrix(graph, metric) for metric in metrics))
+    return sparse.block_diag(transitions, format='csr'), np.column_stack(active)
+
+
+# Multiply the stacked matrix with one column per metric
+def multiply(stacked, x):
+    size, columns = x.shape
+    return (stacked @ x.ravel(order='F')).reshape(size, columns, order='F')
+
+
+# Hub and authority scores for every metric in one batched iteration. Edges point towards the player who came out
+# ahead: hubs are players who lose to the strongest opponents and authorities the players who beat the biggest hubs,
+# which separates e.g. hub pitchers from the authority batters who hit them
+def hits(graph, metrics=tuple(METRICS), tol=HITS_TOLERANCE, max_iter=MAX_ITER):
+    forward, active = stacked_transitions(graph, metrics)
+    backward = forward.T.tocsr()
+    hubs = scale_columns(active.astype(float), active.sum(axis=0))
+    for iteration in range(1, max_iter + 1):
+        hubs_last = hubs
+        authorities = multiply(backward, hubs_last)
+        authorities = scale_columns(authorities, authorities.max(axis=0, initial=0))
+        hubs = multiply(forward, authorities)
+        hubs = scale_columns(hubs, hubs.max(axis=0, initial=0))
+        if (np.abs(hubs - hubs_last).sum(axis=0) < tol).all():
+            break
+    else:
+        raise RuntimeError(f"HITS failed to converge in {max_iter} iterations")
+
+    hubs = scale_columns(hubs, hubs.sum(axis=0))
+    authorities = scale_columns(authorities, authorities.sum(axis=0))
+    node_ids = np.asarray(graph['node_ids'])
+    hub_columns = [f'hub_{metric}' for metric in metrics]
+    authority_columns = [f'authority_{metric}' for metric in metrics]
+    ranks = pd.concat([pd.DataFrame(hubs, index=node_ids, columns=hub_columns),
+                       pd.DataFrame(authorities, index=node_ids, columns=authority_columns)], axis=1)
+    return ranks, iteration
+
+
+# Katz centrality for every metric in one batched iteration, normalized to unit length like nx.katz_centrality
+def katz(graph, metrics=tuple(METRICS), alpha=KATZ_ALPHA, beta=1.0, tol=TOLERANCE, max_iter=MAX_ITER):
+    forward, active = stacked_transitions(graph, metrics)
+    backward = forward.T.tocsr()
+    base = beta * active
+    x = np.zeros(active.shape)
+    threshold = tol * active.sum(axis=0)
+    # Metrics without edges have no players to rank and stay at 0, as in Sparse_PageRank.power_iteration
+    empty = ~active.any(axis=0)
+    for iteration in range(1, max_iter + 1):
+        x_last = x
+        x = alpha * multiply(backward, x_last) + base
+        if ((np.abs(x - x_last).sum(axis=0) < threshold) | empty).all():
+            break
+    else:
+        raise RuntimeError(f"Katz centrality failed to converge in {max_iter} iterations")
+
+    x = scale_columns(x, np.sqrt((x ** 2).sum(axis=0)))
+    ranks = pd.DataFrame(x, index=np.asarray(graph['node_ids']), columns=[f'katz_{metric}' for metric in metrics])
+    return ranks, iteration
+
+
+# PageRank personalized on groups of players, e.g. every team's roster or single players. Each metric is one
+# multi-vector solve with a personalization column per group, teleporting uniformly to the group's active players.
+# Returns one row per (group, player) with a pagerank_<metric> column per metric
+def personalized_pagerank(graph, seeds, metrics=tuple(METRICS), alpha=ALPHA, tol=TOLERANCE, max_iter=MAX_ITER):
+    node_ids = np.asarray(graph['node_ids'])
+    groups = list(seeds)
+    membership = np.column_stack([np.isin(node_ids, list(seeds[group])) for group in groups])
+
+    ranks = {}
+    iterations = 0
+    for metric in metrics:
+        transition, dangling, active = transition_matrix(graph, metric)
+        seeded = membership & active[:, None]
+        # Groups without a single player in this metric's graph have nothing to teleport to and rank as 0
+        ranked = seeded.any(axis=0)
+        x = np.zeros(seeded.shape)
+        if ranked.any():
+            personalization = scale_columns(seeded[:, ranked].astype(float), seeded[:, ranked].sum(axis=0))
+            x[:, ranked], metric_iterations = power_iteration(transition, dangling, personalization, alpha, tol,
+                                                              max_iter)
+            iterations = max(iterations, metric_iterations)
+        ranks[f'pagerank_{metric}'] = x.ravel(order='F')
+
+    ranks = pd.DataFrame({'seed': np.repeat(groups, len(node_ids)), 'player_id': np.tile(node_ids, len(groups)),
+                          **ranks})
+    return ranks, iterations
+
+
+def global_pagerank(graph, metrics=tuple(METRICS), **options):
+    return rank_metrics(graph, metrics, **options)
+
+
+# Centrality engines over the shared normalized per-metric graphs; each returns (ranks indexed by player id,
+# iterations) and new engines only need to be added here
+CENTRALITY_ENGINES = {'pagerank': global_pagerank, 'hits': hits, 'katz': katz}
+
+
+def centrality(graph, method, metrics=tuple(METRICS), **options):
+    return CENTRALITY_ENGINES[method](graph, metrics, **options)
+
+
+# Every team's players from the combined player stats saved by PageRank.py
+def team_rosters():
+    players = read_table('combined_player_stats', columns=['player_id', 'team'])
+    return {team: roster['player_id'].values for team, roster in players.groupby('team')}
+
+
+# Largest absolute difference per engine and metric between the batched solves and NetworkX
+def validate_against_networkx(graph, metrics=tuple(METRICS)):
+    hubs_and_authorities, _ = hits(graph, metrics)
+    katz_ranks, _ = katz(graph, metrics)
+    seed = {'first': np.asarray(graph['node_ids'])[:1]}
+    personalized, _ = personalized_pagerank(graph, seed, metrics)
+    personalized = personalized.set_index('player_id')
+
+    differences = {}
+    for metric in metrics:
+        G = normalize_and_consolidate_for_stat(graph, metric)
+        expected_hubs, expected_authorities = nx.hits(G, max_iter=MAX_ITER, tol=HITS_TOLERANCE)
+        expected = {
+            f'hub_{metric}': (hubs_and_authorities, expected_hubs),
+            f'authority_{metric}': (hubs_and_authorities, expected_authorities),
+            f'katz_{metric}': (katz_ranks, nx.katz_centrality(G, alpha=KATZ_ALPHA, max_iter=MAX_ITER,
+                                                             weight='weight')),
+        }
+        if seed['first'][0] in G:
+            expected[f'pagerank_{metric}'] = (personalized, nx.pagerank(
+                G, alpha=ALPHA, personalization={int(seed['first'][0]): 1}, max_iter=MAX_ITER, weight='weight'))
+        for column, (ranks, values) in expected.items():
+            values = pd.Series(values)
+            differences[column] = (ranks[column].reindex(values.index) - values).abs().max()
+    return differences
+
+
+if __name__ == '__main__':
+    # python Centrality.py saves HITS and Katz scores to the centrality table and PageRank personalized on every
+    # team's roster to the team_pagerank table; python Centrality.py --validate compares them with NetworkX
+    graph = load_matchup_graph()
+    if '--validate' in sys.argv:
+        for column, difference in validate_against_networkx(graph).items():
+            print(f"{column}: max difference from NetworkX {difference:.2e}")
+    else:
+        ranks = pd.concat([centrality(graph, 'hits')[0], centrality(graph, 'katz')[0]], axis=1)
+        write_table(ranks.rename_axis('player_id').reset_index(), 'centrality')
+
+        rosters = team_rosters()
+        team_ranks, iterations = personalized_pagerank(graph, rosters)
+        write_table(team_ranks.rename(columns={'seed': 'team'}), 'team_pagerank')
+        print(f"Ranked {len(graph['node_ids'])} players for {len(rosters)} teams in {iterations} iterations")
@@ -1,85 +1,76 @@
-import pandas as pd
-import networkx as nx
-import pickle
-
-## Load the data
-event_data = pd.read_csv('event_data.csv')
-batter_stats = pd.read_csv('batter_stats.csv').set_index('batter')
-pitcher_stats = pd.read_csv('pitcher_stats.csv').set_index('pitcher')
-
-# Initialize a multi-directed graph
-G = nx.MultiDiGraph()
-
-# Add player nodes with cumulative stats
-for batter_id, batter_row in batter_stats.iterrows():
-    batter_data = batter_row.to_dict()
-    G.add_node(batter_id, **batter_data, role='batter')
-    print(f"Added batter node: {batter_id}, Data: {batter_data}")
-
-for pitcher_id, pitcher_row in pitcher_stats.iterrows():
-    pitcher_data = pitcher_row.to_dict()
-    G.add_node(pitcher_id, **pitcher_data, role='pitcher')
-    print(f"Added pitcher node: {pitcher_id}, Data: {pitcher_data}")
-
-# Dictionary to aggregate statistical measures for each pair of players
-matchup_stats = {}
-
-# Iterate over events
-for _, row in event_data.iterrows():
-    batter_id = row['batter']
-    pitcher_id = row['pitcher']
-    batter_wpa = row['batter_wpa']
-    batter_delta_re = row['batter_delta_re']
-    batter_score = row['batter_score']
-
-    # Update aggregated statistics for each batter-pitcher matchup
-    matchup_key = (batter_id, pitcher_id)
-    if matchup_key not in matchup_stats:
-        matchup_stats[matchup_key] = {
-            'wpa': 0,
-            're': 0,
-            'score': 0
-        }
-
-    # Add batter's statistics to the matchup
-    matchup_stats[matchup_key]['wpa'] += batter_wpa
-    matchup_stats[matchup_key]['re'] += batter_delta_re
-    matchup_stats[matchup_key]['score'] += batter_score
-
-# Create directed edges based on aggregated statistical differences
-for (batter_id, pitcher_id), stats in matchup_stats.items():
-    wpa = stats['wpa']
-    re = stats['re']
-    score = stats['score']
-
-    # Add directed edges for each statistic
-    if wpa > 0:
-        G.add_edge(pitcher_id, batter_id, wpa=wpa)
-    elif wpa < 0:
-        G.add_edge(batter_id, pitcher_id, wpa=wpa)
-
-    if re > 0:
-        G.add_edge(pitcher_id, batter_id, re=re)
-    elif re < 0:
-        G.add_edge(batter_id, pitcher_id, re=re)
-
-    if score > 0:
-        G.add_edge(pitcher_id, batter_id, score=score)
-    elif score < 0:
-        G.add_edge(batter_id, pitcher_id, score=score)
-
-
-def check_edges(graph):
-    for u, v in graph.edges():
-        if graph.number_of_edges(u, v) > 3:
-            print(f"Error: {u} -> {v} has more than 3 edges.")
-
-
-check_edges(G)
-
-# Save the graph
-with open("player_network.pickle", "wb") as f:
-    pickle.dump(G, f)
-
-# Print a summary of the graph
-print(f"Graph created with {len(G.nodes)} nodes and {len(G.edges)} edges.")
+import numpy as np
+from Instrumentation import stage
+from Matchup_Graph import METRICS, aggregate_matchups, build_matchup_graph, number_of_edges, save_matchup_graph
+from Matchup_Timeline import build_matchup_timeline, save_matchup_timeline
+from Storage import read_table
+
+# Print every player node as it is added instead of only a summary
+VERBOSE = False
+
+
+# Two-way players are stored with the pitcher role, so edges are checked against both id sets instead
+def check_edges(graph, batter_ids, pitcher_ids):
+    node_ids = np.asarray(graph['node_ids'])
+    is_batter = np.isin(node_ids, batter_ids)
+    is_pitcher = np.isin(node_ids, pitcher_ids)
+    two_way = is_batter & is_pitcher
+    for metric in METRICS:
+        # Each batter-pitcher pair has at most one edge per statistic, pointing towards the player who came out ahead;
+        # only two two-way players, who faced each other from both sides, can have one each way
+        edges = (graph[metric] != 0).astype(np.int8).tocoo()
+        mutual = edges.multiply(edges.T).tocoo()
+        both_ways = (~(two_way[mutual.row] & two_way[mutual.col])).sum() // 2
+        if both_ways:
+            print(f"Error: {both_ways} player pairs have {metric} edges in both directions.")
+        matchup = ((is_batter[edges.row] & is_pitcher[edges.col]) | (is_pitcher[edges.row] & is_batter[edges.col]))
+        same_role = (~matchup).sum()
+        if same_role:
+            print(f"Error: {same_role} {metric} edges connect two batters or two pitchers.")
+        missing = np.isnan(graph[metric].data).sum()
+        if missing:
+            print(f"Error: {missing} {metric} edges have no weight.")
+        self_loops = np.count_nonzero(graph[metric].diagonal())
+        if self_loops:
+            print(f"Error: {self_loops} {metric} edges connect a player to themselves.")
+
+
+# Graph stage: build the matchup graph from the imported tables and save it for the PageRank stage
+def create_graph(verbose=VERBOSE):
+    ## Load the data, reading only the event columns the matchups need
+    with stage('load_tables') as record:
+        event_data = read_table('event_data', columns=['batter', 'pitcher', 'game_date', 'batter_wpa',
+                                                       'batter_delta_re', 'batter_score'])
+        batter_stats = read_table('batter_stats').set_index('batter')
+        pitcher_stats = read_table('pitcher_stats').set_index('pitcher')
+        record['rows'] = len(event_data)
+
+    # Player nodes; their cumulative stats stay in the stats tables
+    if verbose:
+        for batter_id, batter_row in batter_stats.iterrows():
+            print(f"Added batter node: {batter_id}, Data: {batter_row.to_dict()}")
+        for pitcher_id, pitcher_row in pitcher_stats.iterrows():
+            print(f"Added pitcher node: {pitcher_id}, Data: {pitcher_row.to_dict()}")
+    print(f"Loaded {len(batter_stats)} batters and {len(pitcher_stats)} pitchers.")
+
+    # Aggregate statistical measures for each pair of players in one grouped pass
+    with stage('aggregate_matchups', rows=len(event_data)):
+        matchups = aggregate_matchups(event_data)
+
+    # Create directed edges based on aggregated statistical differences, one sparse matrix per statistic
+    with stage('build_graph', rows=len(matchups)) as record:
+        graph = build_matchup_graph(batter_stats.index.values, pitcher_stats.index.values, matchups)
+        check_edges(graph, batter_stats.index.values, pitcher_stats.index.values)
+        record['edges'] = number_of_edges(graph)
+
+    # Save the graph, with the per-day matchup totals used for as-of-date and time-decayed rankings
+    with stage('save_graph', rows=len(event_data)):
+        save_matchup_graph(graph)
+        save_matchup_timeline(build_matchup_timeline(event_data))
+
+    # Print a summary of the graph
+    print(f"Graph created with {len(graph['node_ids'])} nodes and {number_of_edges(graph)} edges.")
+    return graph
+
+
+if __name__ == '__main__':
+    create_graph()
@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+
+# Default scoring system, run values per event from the batter's point of view
+EVENT_SCORES_FILE = 'event_scores.json'
+
+
+# Load the event -> score table so alternative run values can be tried without editing code
+def load_event_scores(scores_file=EVENT_SCORES_FILE):
+    with open(scores_file) as f:
+        return {event: float(score) for event, score in json.load(f).items()}
+
+
+# Assign WPA, RE, and Score to Batters and Pitchers for every event at once
+def score_events(df, event_scores):
+    # Events missing from the table score 0; the events may be categorical, so convert before filling
+    score = df['events'].map(event_scores).astype(float).fillna(0).values
+
+    # If the inning is Top, the away team is batting
+    # If delta_wpa is positive, it means the home team's win probability increased, and vice versa.
+    home_batting = (df['inning_topbot'] != 'Top').values
+    delta_wpa = df['delta_home_win_exp'].values
+    delta_re = df['delta_run_exp'].values
+    batter_wpa = np.where(home_batting, delta_wpa, -delta_wpa)
+    batter_re = np.where(home_batting, delta_re, -delta_re)
+
+    # Event scores are already from the batter's point of view, so they need no inning flip
+    return df.assign(
+        batter_wpa=batter_wpa, pitcher_wpa=-batter_wpa,
+        batter_delta_re=batter_re, pitcher_delta_re=-batter_re,
+        batter_score=score, pitcher_score=-score
+    )
+
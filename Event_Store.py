@@ -0,0 +1,95 @@
+import os
+import shutil
+
+import pandas as pd
+from Storage import read_table, table_exists, write_table
+
+# Directory holding the date-partitioned events and the running season state
+EVENT_STORE_DIR = 'event_store'
+
+# Subdirectory of the event store holding the running season state and the dates folded into it
+STATE_DIR = 'state'
+
+# Specify the columns that are necessary before transformations
+REQUIRED_COLUMNS = [
+    'batter', 'pitcher', 'events', 'delta_home_win_exp', 'delta_run_exp',
+    'inning_topbot', 'game_pk', 'game_date', 'home_team', 'away_team',
+    'at_bat_number', 'pitch_number', 'post_home_score', 'post_away_score'
+]
+
+# Compact dtypes for the required columns: ids fit in int32, the deltas need no more than float32 precision,
+# and the few distinct events, half innings and teams are stored as categories
+EVENT_DTYPES = {
+    'batter': 'int32', 'pitcher': 'int32', 'game_pk': 'int32',
+    'at_bat_number': 'int16', 'pitch_number': 'int16', 'post_home_score': 'int16', 'post_away_score': 'int16',
+    'delta_home_win_exp': 'float32', 'delta_run_exp': 'float32',
+    'events': 'category', 'inning_topbot': 'category', 'home_team': 'category', 'away_team': 'category'
+}
+
+
+# Project a raw Statcast frame to the events with an outcome and the required columns, with compact dtypes
+def project_events(data):
+    events = data.loc[data['events'].notna(), REQUIRED_COLUMNS]
+    events = events.astype({column: dtype for column, dtype in EVENT_DTYPES.items()})
+    return events.assign(game_date=pd.to_datetime(events['game_date']).dt.strftime('%Y-%m-%d'))
+
+
+# Write one partition per game date, replacing any partition already stored for that date
+def write_event_partitions(events, store_dir=EVENT_STORE_DIR):
+    write_table(events, 'events', data_dir=store_dir, partition_cols=['game_date'])
+
+
+# Read the stored events, optionally only some columns or a range of dates
+def read_event_store(store_dir=EVENT_STORE_DIR, columns=None, start_date=None, end_date=None):
+    if not table_exists('events', store_dir):
+        return pd.DataFrame(columns=columns or REQUIRED_COLUMNS)
+
+    filters = []
+    if start_date is not None:
+        filters.append(('game_date', '>=', start_date))
+    if end_date is not None:
+        filters.append(('game_date', '<=', end_date))
+    return read_table('events', columns=columns, filters=filters or None, data_dir=store_dir)
+
+
+# Dates already fetched, including days without any games so they are not fetched again
+def load_ingested_dates(store_dir=EVENT_STORE_DIR):
+    if not table_exists('ingested_dates', store_dir):
+        return set()
+    return set(read_table('ingested_dates', data_dir=store_dir)['game_date'])
+
+
+def save_ingested_dates(dates, store_dir=EVENT_STORE_DIR):
+    write_table(pd.DataFrame({'game_date': sorted(dates)}), 'ingested_dates', data_dir=store_dir)
+
+
+# Directory of the running season state (unfiltered player stats, game results, team stints) and its dates.
+# A commit interrupted between its two renames leaves only the previous state, which is moved back
+def state_dir(store_dir=EVENT_STORE_DIR):
+    current = os.path.join(store_dir, STATE_DIR)
+    if not os.path.isdir(current) and os.path.isdir(f'{current}.old'):
+        os.rename(f'{current}.old', current)
+    return current
+
+
+def load_state(name, store_dir=EVENT_STORE_DIR):
+    if not table_exists(name, state_dir(store_dir)):
+        return None
+    return read_table(name, data_dir=state_dir(store_dir))
+
+
+# Save every state table together with the dates folded into them as one unit: the tables are written to a
+# staging directory that then replaces the current state, so a crash never leaves a chunk counted in the stats
+# but not marked as ingested
+def commit_state(state, ingested_dates, store_dir=EVENT_STORE_DIR):
+    current = state_dir(store_dir)
+    staging, previous = f'{current}.tmp', f'{current}.old'
+    shutil.rmtree(staging, ignore_errors=True)
+    for name, df in state.items():
+        write_table(df, name, data_dir=staging)
+    save_ingested_dates(ingested_dates, staging)
+
+    if os.path.isdir(current):
+        os.rename(current, previous)
+    os.rename(staging, current)
+    shutil.rmtree(previous, ignore_errors=True)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Batter and pitcher event columns that make up each team stat
+TEAM_STAT_COLUMNS = {
+    'wpa': ('batter_wpa', 'pitcher_wpa'),
+    're': ('batter_delta_re', 'pitcher_delta_re'),
+    'score': ('batter_score', 'pitcher_score')
+}
+
+
+# Determine Game Outcomes and sum every game's home/away stats in one grouped pass
+def determine_game_outcomes(df):
+    value_columns = [column for columns in TEAM_STAT_COLUMNS.values() for column in columns]
+
+    # Totals per game and half inning, one column per (stat, half inning)
+    half_inning = np.where(df['inning_topbot'] == 'Top', 'Top', 'Bot')
+    halves = df[value_columns].groupby([df['game_pk'].values, half_inning]).sum().unstack(fill_value=0)
+    halves = halves.reindex(columns=pd.MultiIndex.from_product([value_columns, ['Top', 'Bot']]), fill_value=0)
+
+    last_pitches = df.sort_values(['game_pk', 'at_bat_number', 'pitch_number']).drop_duplicates('game_pk', keep='last')
+    last_pitches = last_pitches.set_index('game_pk')
+
+    games = pd.DataFrame({
+        'home_team': last_pitches['home_team'],
+        'away_team': last_pitches['away_team'],
+        'home_points': last_pitches['post_home_score'],
+        'away_points': last_pitches['post_away_score']
+    })
+
+    # A game still tied after its last pitch was suspended and not completed within the data, so it has no winner
+    tied = games['home_points'] == games['away_points']
+    games['winner'] = np.where(games['home_points'] > games['away_points'], games['home_team'], games['away_team'])
+    games['winner'] = games['winner'].where(~tied)
+
+    # The home team bats in the bottom half and pitches in the top half
+    for stat, (batter_column, pitcher_column) in TEAM_STAT_COLUMNS.items():
+        games[f'home_team_{stat}'] = halves[(batter_column, 'Bot')] + halves[(pitcher_column, 'Top')]
+        games[f'away_team_{stat}'] = halves[(batter_column, 'Top')] + halves[(pitcher_column, 'Bot')]
+
+    games['status'] = np.where(tied, 'suspended', 'final')
+
+    # Resumed suspended games span several dates; record the date the game finished
+    games['game_date'] = df.groupby('game_pk')['game_date'].max()
+
+    games.index.name = 'game_pk'
+    return games.reset_index()
+
+
+# Aggregate Team Stats from the per-game totals, crediting each team for the games it played in
+def aggregate_team_stats(game_results):
+    final = game_results['status'] == 'final'
+    team_games = []
+    for side in ['home', 'away']:
+        team = game_results[f'{side}_team']
+        team_games.append(pd.DataFrame({
+            'team': team,
+            'total_wpa': game_results[f'{side}_team_wpa'],
+            'total_re': game_results[f'{side}_team_re'],
+            'total_score': game_results[f'{side}_team_score'],
+            'wins': (final & (game_results['winner'] == team)).astype(int),
+            'losses': (final & (game_results['winner'] != team)).astype(int),
+            'suspended': (~final).astype(int)
+        }))
+
+    team_stats = pd.concat(team_games, ignore_index=True).groupby('team', observed=True).sum()
+    team_stats.index.name = None
+    return team_stats
+
+
+# Combine results for newly ingested events with earlier results; a game resumed after a suspension
+# adds its new totals to the earlier ones and takes its final score from the later events
+def merge_game_results(previous, latest):
+    stat_columns = [f'{side}_team_{stat}' for stat in TEAM_STAT_COLUMNS for side in ['home', 'away']]
+    resumed = previous[previous['game_pk'].isin(latest['game_pk'])].set_index('game_pk')[stat_columns]
+
+    latest = latest.set_index('game_pk')
+    latest.loc[resumed.index, stat_columns] += resumed
+    return pd.concat([previous[~previous['game_pk'].isin(latest.index)], latest.reset_index()], ignore_index=True)
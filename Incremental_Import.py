@@ -0,0 +1,155 @@
+import sys
+
+import pandas as pd
+import pybaseball as py
+from Event_Scoring import EVENT_SCORES_FILE, load_event_scores, score_events
+from Event_Store import (EVENT_STORE_DIR, commit_state, load_ingested_dates, load_state, read_event_store,
+                         state_dir, write_event_partitions)
+from Game_Outcomes import aggregate_team_stats, determine_game_outcomes, merge_game_results
+from Player_Lookup import resolve_players
+from Player_Stats import MIN_OCCURRENCES, accumulate_player_stats
+from Player_Teams import get_player_teams, get_team_stints, merge_team_stints
+from Statcast_Fetch import fetch_range
+from Storage import write_table
+
+# First date fetched when the event store is empty
+SEASON_START = '2023-03-30'
+PAYROLL_FILE = 'payroll_2023.csv'
+
+# Days folded into the running state together; the state is saved after every chunk, and event_data is rewritten
+# one chunk at a time. Fetching itself is chunked separately by Statcast_Fetch.CHUNK_DAYS
+INGEST_CHUNK_DAYS = 7
+
+# Running season state saved in the event store after every chunk
+STATE_TABLES = ['batter_stats', 'pitcher_stats', 'player_team_stints', 'game_results']
+
+PLAYER_STATS_COLUMNS = ['player_id', 'team', 'cumulative_wpa', 'cumulative_re', 'cumulative_score', 'name', 'aav',
+                        'occurrences']
+
+
+# Every date after the last ingested one, up to and including the end date
+def dates_to_fetch(ingested_dates, end_date, season_start=SEASON_START):
+    # Today's games may still be in progress and their events would be folded into the running stats for good,
+    # so the range stops at yesterday, as in Statcast_Fetch.fetch_range
+    yesterday = pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+    end_date = min(pd.Timestamp(end_date), yesterday)
+    start = pd.Timestamp(max(ingested_dates)) + pd.Timedelta(days=1) if ingested_dates else pd.Timestamp(season_start)
+    return [date.strftime('%Y-%m-%d') for date in pd.date_range(start, end_date)]
+
+
+# Fetch the events for a contiguous range of dates through the raw cache, with compact dtypes
+def fetch_events(dates):
+    return fetch_range(dates[0], dates[-1])
+
+
+# Add the new events to the running stats; players who did not play keep their totals untouched
+def update_player_stats(stats_df, events, role, players):
+    new_players = players[players['player_id'].isin(events[role]) & ~players['player_id'].isin(stats_df['player_id'])]
+    new_rows = new_players.assign(cumulative_wpa=0.0, cumulative_re=0.0, cumulative_score=0.0, occurrences=0)
+    stats_df = pd.concat([stats_df, new_rows[PLAYER_STATS_COLUMNS]], ignore_index=True)
+
+    stats_df = accumulate_player_stats(events, stats_df, role)
+    occurrences = stats_df['player_id'].map(events[role].value_counts()).fillna(0)
+    stats_df['occurrences'] = stats_df['occurrences'].astype(int) + occurrences.astype(int).values
+    return stats_df
+
+
+# Write the same outputs as Import.py, keeping only eligible players and their events. The events are filtered
+# one chunk of dates at a time, so the season is never read back into memory at once
+def save_outputs(batter_stats_df, pitcher_stats_df, game_results, team_stats_df, team_stints, store_dir,
+                 chunk_days=INGEST_CHUNK_DAYS):
+    batter_stats_df = batter_stats_df[batter_stats_df['occurrences'] >= MIN_OCCURRENCES]
+    pitcher_stats_df = pitcher_stats_df[pitcher_stats_df['occurrences'] >= MIN_OCCURRENCES]
+
+    dates = sorted(load_ingested_dates(state_dir(store_dir)))
+    for i in range(0, len(dates), chunk_days):
+        chunk = dates[i:i + chunk_days]
+        event_data = read_event_store(store_dir, start_date=chunk[0], end_date=chunk[-1])
+        event_data = event_data[event_data['batter'].isin(batter_stats_df['player_id']) &
+                                event_data['pitcher'].isin(pitcher_stats_df['player_id'])]
+        # The first chunk replaces the whole table, so dates written by Import.py or earlier runs do not linger
+        if i == 0 or not event_data.empty:
+            write_table(event_data, 'event_data', partition_cols=['game_date'], overwrite=i == 0)
+
+    write_table(batter_stats_df.drop(columns='occurrences').rename(columns={'player_id': 'batter'}), 'batter_stats')
+    write_table(pitcher_stats_df.drop(columns='occurrences').rename(columns={'player_id': 'pitcher'}), 'pitcher_stats')
+    write_table(game_results, 'game_results')
+    write_table(team_stats_df.rename_axis('team').reset_index(), 'team_stats')
+    write_table(team_stints, 'player_team_stints')
+
+
+# Fold one chunk of scored events into the running season state: player stats, team stints and game results
+def ingest_events(events, state):
+    # Resolve names and AAV only for players appearing for the first time
+    known_ids = set(state['batter_stats']['player_id']) | set(state['pitcher_stats']['player_id'])
+    new_ids = [player_id for player_id in pd.unique(pd.concat([events['batter'], events['pitcher']]))
+               if player_id not in known_ids]
+    players = resolve_players(new_ids, PAYROLL_FILE)
+
+    # Extend the team stints and refresh the team of everyone who played, e.g. after a trade
+    latest_stints = get_team_stints(events)
+    previous_stints = state['player_team_stints']
+    team_stints = latest_stints if previous_stints is None else merge_team_stints(previous_stints, latest_stints)
+    current_teams = get_player_teams(team_stints)
+    players['team'] = players['player_id'].map(current_teams).fillna('Unknown')
+
+    batter_stats_df = update_player_stats(state['batter_stats'], events, 'batter', players)
+    pitcher_stats_df = update_player_stats(state['pitcher_stats'], events, 'pitcher', players)
+    for stats_df in [batter_stats_df, pitcher_stats_df]:
+        stats_df['team'] = stats_df['player_id'].map(current_teams).fillna(stats_df['team'])
+
+    # Games suspended in an earlier chunk and resumed in this one add to their earlier totals
+    latest_games = determine_game_outcomes(events)
+    previous_games = state['game_results']
+    game_results = latest_games if previous_games is None else merge_game_results(previous_games, latest_games)
+
+    state.update(batter_stats=batter_stats_df, pitcher_stats=pitcher_stats_df, player_team_stints=team_stints,
+                 game_results=game_results)
+    return len(new_ids)
+
+
+# Fetch the dates missing since the last run one chunk at a time, updating only the players and games each chunk
+# touches; the state is saved after every chunk, so an interrupted run resumes from the last completed chunk
+def run_incremental(end_date, store_dir=EVENT_STORE_DIR, chunk_days=INGEST_CHUNK_DAYS):
+    ingested_dates = load_ingested_dates(state_dir(store_dir))
+    dates = dates_to_fetch(ingested_dates, end_date)
+    if not dates:
+        print(f"Event store is up to date through {end_date}")
+        return
+
+    empty_stats = pd.DataFrame(columns=PLAYER_STATS_COLUMNS)
+    state = {name: load_state(name, store_dir) for name in STATE_TABLES}
+    for role_stats in ['batter_stats', 'pitcher_stats']:
+        state[role_stats] = empty_stats if state[role_stats] is None else state[role_stats]
+
+    event_scores = load_event_scores(EVENT_SCORES_FILE)
+    ingested_events = ingested_games = new_players = 0
+    for i in range(0, len(dates), chunk_days):
+        chunk = dates[i:i + chunk_days]
+        events = fetch_events(chunk)
+        if not events.empty:
+            events = score_events(events, event_scores)
+            # Rewriting the chunk's partitions is idempotent, so they are written before the state commit
+            write_event_partitions(events, store_dir)
+            new_players += ingest_events(events, state)
+            ingested_events += len(events)
+            ingested_games += events['game_pk'].nunique()
+        ingested_dates |= set(chunk)
+        commit_state({name: state[name] for name in STATE_TABLES if state[name] is not None}, ingested_dates,
+                     store_dir)
+
+    if not ingested_events:
+        print(f"No events between {dates[0]} and {dates[-1]}")
+        return
+
+    save_outputs(state['batter_stats'], state['pitcher_stats'], state['game_results'],
+                 aggregate_team_stats(state['game_results']), state['player_team_stints'], store_dir, chunk_days)
+    print(f"Ingested {ingested_events} events from {dates[0]} to {dates[-1]}: "
+          f"{ingested_games} games, {new_players} new players")
+
+
+if __name__ == '__main__':
+    # Refresh through yesterday by default: python Incremental_Import.py [end_date]
+    py.cache.enable()
+    yesterday = (pd.Timestamp.today() - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    run_incremental(sys.argv[1] if len(sys.argv) > 1 else yesterday)
@@ -0,0 +1,113 @@
+import sys
+
+import numpy as np
+import pandas as pd
+from Matchup_Graph import (METRICS, ROLES, aggregate_matchups, build_matchup_graph, load_matchup_graph,
+                           save_matchup_graph)
+from Matchup_Timeline import extend_matchup_timeline, load_matchup_timeline, save_matchup_timeline
+from Sparse_PageRank import ALPHA, TOLERANCE, rank_metrics
+from Storage import read_table, table_exists, write_table
+
+# Tables holding the last PageRank vectors and a log of every ranking run
+RANK_STATE_TABLE = 'pagerank_state'
+RANK_RUNS_TABLE = 'pagerank_runs'
+
+
+# Recover each batter-pitcher matchup total from the graph; the sign of an edge tells which end is the pitcher
+def matchups_from_graph(graph):
+    node_ids = np.asarray(graph['node_ids'])
+    metric_totals = []
+    for metric in METRICS:
+        edges = graph[metric].tocoo()
+        positive = edges.data > 0
+        metric_totals.append(pd.DataFrame({
+            'batter': node_ids[np.where(positive, edges.col, edges.row)],
+            'pitcher': node_ids[np.where(positive, edges.row, edges.col)],
+            metric: edges.data
+        }).groupby(['batter', 'pitcher']).sum())
+    return pd.concat(metric_totals, axis=1).fillna(0).reset_index()
+
+
+# Add the matchup totals of newly ingested events to the graph and rebuild its edges
+def apply_matchup_deltas(graph, events):
+    matchups = pd.concat([matchups_from_graph(graph), aggregate_matchups(events)])
+    matchups = matchups.groupby(['batter', 'pitcher']).sum().reset_index()
+
+    node_ids = np.asarray(graph['node_ids'])
+    is_pitcher = np.asarray(graph['roles']) == ROLES.index('pitcher')
+    batter_ids = np.concatenate([node_ids[~is_pitcher], events['batter'].values])
+    pitcher_ids = np.unique(np.concatenate([node_ids[is_pitcher], events['pitcher'].values]))
+    return build_matchup_graph(batter_ids, pitcher_ids, matchups)
+
+
+# The dates that are not in the timeline yet; dates already folded into the graph would be counted twice
+def unapplied_dates(timeline, dates):
+    applied_days = set(np.unique(np.asarray(timeline['day'])).tolist())
+    return [date for date in dates if np.datetime64(date, 'D').astype(np.int32) not in applied_days]
+
+
+def describe_savings(iterations_saved):
+    if iterations_saved is None:
+        return "no cold run on the same graph and alpha to compare the warm start with"
+    return f"{iterations_saved} saved by the warm start"
+
+
+def load_previous_ranks():
+    if not table_exists(RANK_STATE_TABLE):
+        return None
+    return read_table(RANK_STATE_TABLE).set_index('player_id')
+
+
+# Rank the graph starting from the previous solution when there is one, and log the run.
+# Iterations saved are measured against the most recent run that started from a uniform vector on a graph of
+# the same size with the same alpha; without one the saving is unknown and left as None
+def rank_incremental(graph, alpha=ALPHA, tol=TOLERANCE):
+    previous = load_previous_ranks()
+    ranks, iterations = rank_metrics(graph, alpha=alpha, tol=tol, start=previous)
+    nodes = len(graph['node_ids'])
+    edges = sum(graph[metric].nnz for metric in METRICS)
+
+    runs = read_table(RANK_RUNS_TABLE) if table_exists(RANK_RUNS_TABLE) else None
+    iterations_saved = None
+    if previous is None:
+        iterations_saved = 0
+    elif runs is not None:
+        comparable = runs[~runs['warm_start'] & (runs['nodes'] == nodes) & (runs['edges'] == edges) &
+                          (runs['alpha'] == alpha)]
+        if len(comparable):
+            iterations_saved = int(comparable['iterations'].iloc[-1]) - iterations
+
+    run = pd.DataFrame({
+        'run_at': [pd.Timestamp.now()],
+        'nodes': [nodes],
+        'edges': [edges],
+        'alpha': [alpha],
+        'warm_start': [previous is not None],
+        'iterations': [iterations],
+        'iterations_saved': pd.array([iterations_saved], dtype='Int64')
+    })
+    write_table(run if runs is None else pd.concat([runs, run], ignore_index=True), RANK_RUNS_TABLE)
+    write_table(ranks.rename_axis('player_id').reset_index(), RANK_STATE_TABLE)
+    return ranks, iterations, iterations_saved
+
+
+if __name__ == '__main__':
+    # Fold newly ingested dates into the saved graph and re-rank from the previous solution:
+    # python Incremental_PageRank.py 2023-05-01 [2023-05-02 ...]
+    graph = load_matchup_graph(mmap_mode=None)
+    timeline = load_matchup_timeline(mmap_mode=None)
+    dates = unapplied_dates(timeline, sys.argv[1:])
+    skipped = sorted(set(sys.argv[1:]) - set(dates))
+    if skipped:
+        print(f"Skipping {', '.join(skipped)}: already in the graph")
+    if dates:
+        new_events = read_table('event_data', columns=['batter', 'pitcher', 'game_date', *METRICS.values()],
+                                filters=[('game_date', 'in', dates)])
+        timeline = extend_matchup_timeline(timeline, new_events)
+        graph = apply_matchup_deltas(graph, new_events)
+        save_matchup_graph(graph)
+        save_matchup_timeline(timeline)
+        print(f"Applied {len(new_events)} new events from {len(dates)} dates")
+
+    ranks, iterations, iterations_saved = rank_incremental(graph)
+    print(f"Ranked {len(ranks)} players in {iterations} iterations ({describe_savings(iterations_saved)})")
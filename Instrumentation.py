@@ -0,0 +1,88 @@
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then left out of the records
+    resource = None
+
+# Machine-readable report of the last pipeline run, and the cProfile dump written when profiling is on
+RUN_REPORT_FILE = 'run_report.json'
+PROFILE_FILE = 'pipeline.prof'
+
+# Records of the current run in the order the stages finished, and the names of the stages still open
+run_records = []
+open_stages = []
+
+
+# Peak resident set size of the process so far in MB; ru_maxrss is in kilobytes on Linux and bytes on macOS
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+# Time a stage or loop and record its rows, throughput and peak RSS. Stages nest, e.g. 'import/score_events';
+# set record['rows'] (or any other detail) inside the block when the row count is only known at the end
+@contextmanager
+def stage(name, rows=None, **details):
+    record = {'stage': '/'.join([*open_stages, name]), 'rows': rows, **details}
+    open_stages.append(name)
+    start_time = time.perf_counter()
+    record['status'] = 'failed'
+    try:
+        yield record
+        record['status'] = 'ok'
+    finally:
+        open_stages.pop()
+        seconds = time.perf_counter() - start_time
+        record['seconds'] = round(seconds, 4)
+        record['rows_per_second'] = round(record['rows'] / seconds) if record['rows'] and seconds > 0 else None
+        record['peak_rss_mb'] = peak_rss_mb()
+        run_records.append(record)
+
+        progress = f"{'  ' * len(open_stages)}{name}: {seconds:.2f} s"
+        if record['rows']:
+            progress += f", {record['rows']:,} rows ({record['rows_per_second']:,} rows/s)"
+        if record['peak_rss_mb'] is not None:
+            progress += f", peak RSS {record['peak_rss_mb']:,.0f} MB"
+        print(progress)
+
+
+def reset_run():
+    run_records.clear()
+
+
+# Write the records of the current run as JSON, with any run-level details such as the parameters used
+def write_run_report(report_file=RUN_REPORT_FILE, **details):
+    report = {
+        'finished_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        **details,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': run_records
+    }
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=4, default=str)
+
+
+# Profile the block with cProfile and dump the stats for `python -m pstats` or snakeviz; a no-op when disabled
+@contextmanager
+def profiled(profile_file=PROFILE_FILE, enabled=True):
+    if not enabled:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_file)
+        print(f"Saved profile to {profile_file}")
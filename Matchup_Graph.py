@@ -0,0 +1,104 @@
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Directory holding the saved graph arrays
+GRAPH_DIR = 'player_network'
+
+# Edge metrics and the batter event column each one sums
+METRICS = {'wpa': 'batter_wpa', 're': 'batter_delta_re', 'score': 'batter_score'}
+
+# Node roles are stored as small integers so every array can be memory-mapped
+ROLES = ['batter', 'pitcher']
+
+
+# Sum the batter's event stats for every batter-pitcher matchup in one grouped reduction
+def aggregate_matchups(event_data):
+    matchups = event_data.groupby(['batter', 'pitcher'])[list(METRICS.values())].sum()
+    return matchups.rename(columns={column: metric for metric, column in METRICS.items()}).reset_index()
+
+
+# Sum the totals of every batter-pitcher pair (given as node positions) into one signed edge per pair.
+# Each total is directed towards the player who came out ahead, as in the original MultiDiGraph:
+# positive totals point from the pitcher to the batter, negative totals from the batter to the pitcher
+def directed_matchup_matrix(batter_index, pitcher_index, values, size):
+    totals = sparse.coo_matrix((values, (batter_index, pitcher_index)), shape=(size, size)).tocsr().tocoo()
+    positive = totals.data > 0
+    has_edge = totals.data != 0
+    rows = np.where(positive, totals.col, totals.row)[has_edge]
+    cols = np.where(positive, totals.row, totals.col)[has_edge]
+    return sparse.csr_matrix((totals.data[has_edge], (rows, cols)), shape=(size, size))
+
+
+# Build the matchup graph: integer node ids plus one sparse (CSR) matrix of signed edge weights per metric
+def build_matchup_graph(batter_ids, pitcher_ids, matchups):
+    node_ids = np.unique(np.concatenate([batter_ids, pitcher_ids, matchups['batter'], matchups['pitcher']]))
+    node_ids = node_ids.astype(np.int64)
+
+    # Players who both bat and pitch keep the pitcher role, as they did when pitcher nodes were added last
+    roles = np.zeros(len(node_ids), dtype=np.int8)
+    roles[np.searchsorted(node_ids, pitcher_ids)] = ROLES.index('pitcher')
+
+    batter_index = np.searchsorted(node_ids, matchups['batter'].values)
+    pitcher_index = np.searchsorted(node_ids, matchups['pitcher'].values)
+
+    graph = {'node_ids': node_ids, 'roles': roles}
+    for metric in METRICS:
+        values = matchups[metric].values.astype(np.float64)
+        graph[metric] = directed_matchup_matrix(batter_index, pitcher_index, values, len(node_ids))
+    return graph
+
+
+def number_of_edges(graph):
+    return sum(graph[metric].nnz for metric in METRICS)
+
+
+# Position of each player id in the node arrays
+def node_index(graph):
+    return pd.Series(np.arange(len(graph['node_ids'])), index=graph['node_ids'])
+
+
+# Save every array as its own .npy file so the graph can be loaded without unpickling
+def save_matchup_graph(graph, graph_dir=GRAPH_DIR):
+    os.makedirs(graph_dir, exist_ok=True)
+    np.save(os.path.join(graph_dir, 'node_ids.npy'), graph['node_ids'])
+    np.save(os.path.join(graph_dir, 'roles.npy'), graph['roles'])
+    for metric in METRICS:
+        matrix = graph[metric]
+        np.save(os.path.join(graph_dir, f'{metric}_indptr.npy'), matrix.indptr)
+        np.save(os.path.join(graph_dir, f'{metric}_indices.npy'), matrix.indices)
+        np.save(os.path.join(graph_dir, f'{metric}_data.npy'), matrix.data)
+
+
+# Load the graph with the arrays memory-mapped, so only the parts that are used are read from disk
+def load_matchup_graph(graph_dir=GRAPH_DIR, mmap_mode='r'):
+    def load(name):
+        return np.load(os.path.join(graph_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    graph = {'node_ids': load('node_ids'), 'roles': load('roles')}
+    size = len(graph['node_ids'])
+    for metric in METRICS:
+        graph[metric] = sparse.csr_matrix(
+            (load(f'{metric}_data'), load(f'{metric}_indices'), load(f'{metric}_indptr')), shape=(size, size))
+    return graph
+
+
+# Expand the graph into the NetworkX MultiDiGraph the visualization uses, with the player stats as node attributes
+def to_networkx(graph, batter_stats=None, pitcher_stats=None):
+    G = nx.MultiDiGraph()
+    node_ids = np.asarray(graph['node_ids'])
+    G.add_nodes_from((int(node_id), {'role': ROLES[role]}) for node_id, role in zip(node_ids, graph['roles']))
+
+    for stats, role in [(batter_stats, 'batter'), (pitcher_stats, 'pitcher')]:
+        if stats is not None:
+            for player_id, row in stats.iterrows():
+                G.add_node(player_id, **row.to_dict(), role=role)
+
+    for metric in METRICS:
+        edges = graph[metric].tocoo()
+        G.add_edges_from((int(u), int(v), {metric: float(weight)})
+                         for u, v, weight in zip(node_ids[edges.row], node_ids[edges.col], edges.data))
+    return G
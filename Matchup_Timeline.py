@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+from Matchup_Graph import GRAPH_DIR, METRICS, directed_matchup_matrix
+
+# Per-day matchup totals are saved next to the graph arrays with this prefix
+TIMELINE_PREFIX = 'timeline'
+
+
+# Sum each batter-pitcher matchup per game date, keeping the player ids and the day of every total
+def build_matchup_timeline(event_data):
+    daily = event_data.groupby(['batter', 'pitcher', 'game_date'])[list(METRICS.values())].sum().reset_index()
+    timeline = {
+        'batter': daily['batter'].values.astype(np.int64),
+        'pitcher': daily['pitcher'].values.astype(np.int64),
+        # Days since 1970-01-01, so decay can be computed with plain integer arithmetic
+        'day': pd.to_datetime(daily['game_date']).values.astype('datetime64[D]').astype(np.int32)
+    }
+    for metric, column in METRICS.items():
+        timeline[metric] = daily[column].values.astype(np.float64)
+    return timeline
+
+
+# Append the daily totals of newly ingested events to an existing timeline
+def extend_matchup_timeline(timeline, event_data):
+    latest = build_matchup_timeline(event_data)
+    return {name: np.concatenate([np.asarray(timeline[name]), latest[name]]) for name in latest}
+
+
+def save_matchup_timeline(timeline, graph_dir=GRAPH_DIR):
+    os.makedirs(graph_dir, exist_ok=True)
+    for name, values in timeline.items():
+        np.save(os.path.join(graph_dir, f'{TIMELINE_PREFIX}_{name}.npy'), values)
+
+
+def load_matchup_timeline(graph_dir=GRAPH_DIR, mmap_mode='r'):
+    names = ['batter', 'pitcher', 'day', *METRICS]
+    return {name: np.load(os.path.join(graph_dir, f'{TIMELINE_PREFIX}_{name}.npy'), mmap_mode=mmap_mode)
+            for name in names}
+
+
+# The graph as of a date: matchups after the date are dropped and each day's totals are weighted by
+# 0.5 ** (age in days / half life), so last night's matchups count more than April's. Without a half life
+# every matchup up to the date counts fully.
+def decayed_matchup_graph(graph, timeline, as_of_date=None, half_life_days=None):
+    days = np.asarray(timeline['day'])
+    if not len(days):
+        raise ValueError("The matchup timeline is empty; run Create_Graph.py on imported events first")
+    as_of = days.max() if as_of_date is None else np.datetime64(as_of_date, 'D').astype(np.int32)
+    if as_of < days.min():
+        first_date = np.datetime64(int(days.min()), 'D')
+        raise ValueError(f"No matchups on or before {as_of_date}; the timeline starts on {first_date}")
+    keep = days <= as_of
+    decay = 1.0 if half_life_days is None else 0.5 ** ((as_of - days[keep]) / half_life_days)
+
+    node_ids = np.asarray(graph['node_ids'])
+    size = len(node_ids)
+    batter_index = np.searchsorted(node_ids, np.asarray(timeline['batter'])[keep])
+    pitcher_index = np.searchsorted(node_ids, np.asarray(timeline['pitcher'])[keep])
+
+    decayed = {'node_ids': graph['node_ids'], 'roles': graph['roles']}
+    for metric in METRICS:
+        # Sum the decayed days of every matchup into one directed edge
+        values = np.asarray(timeline[metric])[keep] * decay
+        decayed[metric] = directed_matchup_matrix(batter_index, pitcher_index, values, size)
+    return decayed
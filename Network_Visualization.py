@@ -1,32 +1,122 @@
-import matplotlib.pyplot as plt
+import hashlib
+import os
+import pickle
+import sys
+
 import networkx as nx
 import numpy as np
-import pickle
+import pandas as pd
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from scipy import sparse
+from Matchup_Graph import ROLES, load_matchup_graph
+from Sparse_PageRank import rank_metrics
+
+# Rendered network; the format follows the extension, e.g. .png or .svg
+OUTPUT_FILE = 'player_network.png'
+
+# Annotated graph saved by PageRank.py, read for the pagerank_* node attributes
+UPDATED_NETWORK_FILE = 'updated_network.pickle'
+
+# Spring layouts already computed, one file per graph content hash
+LAYOUT_CACHE_DIR = 'layout_cache'
+
+# Only the top players by PageRank are laid out and drawn
+TOP_K = 200
+
+# Spring layout spacing and iterations; both are part of the layout cache key
+LAYOUT_K = 0.15
+LAYOUT_ITERATIONS = 50
+
+
+# PageRank of every player for a metric, from the pagerank_* node attributes saved by PageRank.py,
+# or ranked from the compact graph when the annotated graph has not been saved yet
+def load_pagerank(graph, metric, pickle_file=UPDATED_NETWORK_FILE):
+    if os.path.exists(pickle_file):
+        with open(pickle_file, 'rb') as f:
+            G = pickle.load(f)
+        pagerank = pd.Series(nx.get_node_attributes(G, f'pagerank_{metric}'), dtype=float)
+        return pagerank.reindex(np.asarray(graph['node_ids'])).fillna(0).values
+    ranks, _ = rank_metrics(graph)
+    return ranks[f'pagerank_{metric}'].values
+
+
+# Positions of the players to draw: the top_k by PageRank, dropping any below min_pagerank
+def top_players(pagerank, top_k=TOP_K, min_pagerank=None):
+    keep = np.argsort(-pagerank, kind='stable')[:top_k]
+    if min_pagerank is not None:
+        keep = keep[pagerank[keep] >= min_pagerank]
+    return np.sort(keep)
+
+
+# Collapse the parallel edges of every player pair (one per metric and direction in the MultiDiGraph)
+# into one undirected edge weighted by the absolute total of the metric
+def collapse_edges(graph, metric):
+    weights = abs(graph[metric]).tocsr()
+    return sparse.triu(weights + weights.T, k=1).tocsr()
+
+
+# Hash of the players and edges being laid out and the layout settings
+def layout_key(node_ids, edges, k=LAYOUT_K, iterations=LAYOUT_ITERATIONS, seed=0):
+    digest = hashlib.sha256()
+    for array in [np.asarray(node_ids, dtype=np.int64), edges.indptr, edges.indices, edges.data]:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(f'{k}-{iterations}-{seed}'.encode())
+    return digest.hexdigest()
+
+
+# Spring layout of the collapsed edges, reused from the cache whenever the same graph is drawn again
+def cached_layout(node_ids, edges, cache_dir=LAYOUT_CACHE_DIR, k=LAYOUT_K, iterations=LAYOUT_ITERATIONS, seed=0):
+    edges = edges.tocsr()
+    layout_file = os.path.join(cache_dir, f'{layout_key(node_ids, edges, k, iterations, seed)}.npy')
+    if os.path.exists(layout_file):
+        return np.load(layout_file)
+
+    # Edge weights are scaled to at most 1 so the attraction between players stays comparable to k
+    normalized = edges / edges.data.max() if edges.nnz else edges
+    G = nx.from_scipy_sparse_array(normalized)
+    layout = nx.spring_layout(G, k=k, iterations=iterations, seed=seed, weight='weight')
+    positions = np.array([layout[node] for node in range(len(node_ids))]).reshape(-1, 2)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(layout_file, positions)
+    return positions
+
+
+# Visualization stage: draw the top players of the saved graph to an image file
+def draw_network(output_file=OUTPUT_FILE, metric='wpa', top_k=TOP_K, min_pagerank=None,
+                 pickle_file=UPDATED_NETWORK_FILE):
+    graph = load_matchup_graph()
+    pagerank = load_pagerank(graph, metric, pickle_file)
 
-# Load the saved graph
-with open("player_network.pickle", "rb") as f:
-    G = pickle.load(f)
+    # Filter the players and collapse their edges before the layout, which is the slow part
+    keep = top_players(pagerank, top_k, min_pagerank)
+    edges = collapse_edges(graph, metric)[keep][:, keep].tocoo()
+    positions = cached_layout(np.asarray(graph['node_ids'])[keep], edges)
 
-# Adjusted edge alpha calculation for MultiDiGraph
-#edge_alphas = [np.log(abs(G[u][v][key]['weight']) + 1) if 'weight' in G[u][v][key] else 0
-               #for u, v, key in G.edges(keys=True)]
+    figure = Figure(figsize=(15, 15))
+    ax = figure.add_subplot()
 
-# Node colors and sizes
-node_colors = ['red' if G.nodes[node]['role'] == 'pitcher' else 'blue' for node in G.nodes]
-node_sizes = [np.log(abs(G.nodes[node].get('wpa', 1)) + 1) * 100 for node in G.nodes]  # Scaling node size
+    # Every edge is drawn in one collection, wider for larger matchup totals
+    strength = edges.data / edges.data.max() if edges.nnz else edges.data
+    segments = np.stack([positions[edges.row], positions[edges.col]], axis=1)
+    ax.add_collection(LineCollection(segments, colors='grey', linewidths=0.2 + 1.5 * strength, alpha=0.4))
 
-# Position layout
-pos = nx.spring_layout(G, scale=2, k=0.15)  # Adjust k for node spacing
+    # Node colors by role and sizes by PageRank
+    roles = np.asarray(graph['roles'])[keep]
+    node_colors = np.where(roles == ROLES.index('pitcher'), 'red', 'blue')
+    kept_pagerank = pagerank[keep]
+    node_sizes = 10 + 300 * kept_pagerank / (kept_pagerank.max() or 1)
+    ax.scatter(positions[:, 0], positions[:, 1], c=node_colors, s=node_sizes, zorder=2)
 
-# Drawing the network
-plt.figure(figsize=(15, 15))
-nx.draw_networkx_edges(G, pos,  edge_color='grey', width=0.5) # alpha=edge_alphas,
-nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=node_sizes)
+    ax.set_title(f'MLB Player Network: top {len(keep)} players by {metric.upper()} PageRank')
+    ax.axis('off')  # Turn off the axis
+    figure.savefig(output_file, dpi=150, bbox_inches='tight')
+    print(f"Saved {len(keep)} players and {edges.nnz} edges to {output_file}")
 
-# Omitting labels for clarity
-# nx.draw_networkx_labels(G, pos)  # This line is commented out to remove labels
 
-# Show plot
-plt.title('MLB Player Network')
-plt.axis('off')  # Turn off the axis
-plt.show()
+if __name__ == '__main__':
+    # python Network_Visualization.py [output_file] [top_k], e.g. python Network_Visualization.py network.svg 100
+    output_file = sys.argv[1] if len(sys.argv) > 1 else OUTPUT_FILE
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else TOP_K
+    draw_network(output_file, top_k=top_k)
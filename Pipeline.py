@@ -0,0 +1,196 @@
+import ast
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+from Create_Graph import create_graph
+from Event_Scoring import EVENT_SCORES_FILE, load_event_scores
+from Import import END_DATE, PAYROLL_FILE, START_DATE, run_import
+from Instrumentation import profiled, reset_run, stage, write_run_report
+from Matchup_Graph import GRAPH_DIR
+from Network_Visualization import OUTPUT_FILE, TOP_K, draw_network
+from PageRank import AS_OF_DATE, HALF_LIFE_DAYS, run_pagerank
+from Player_Stats import MIN_OCCURRENCES
+from Sparse_PageRank import ALPHA
+from Storage import table_exists
+
+# Stage keys of the last successful run of every stage
+PIPELINE_STATE_FILE = 'pipeline_state.json'
+
+# Directory of the pipeline modules; only imports of modules found here are part of a stage's code
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PARAMS = {
+    'start_date': START_DATE,
+    'end_date': END_DATE,
+    'scores_file': EVENT_SCORES_FILE,
+    'min_occurrences': MIN_OCCURRENCES,
+    'alpha': ALPHA,
+    'as_of_date': AS_OF_DATE,
+    'half_life_days': HALF_LIFE_DAYS,
+    'top_k': TOP_K
+}
+
+# Every stage lists the parameters it takes, the stages whose outputs it reads, the input files it reads outside
+# the parameters, and the tables and files it writes. Stages are listed in the order they run
+STAGES = {
+    'import': {
+        'run': run_import,
+        'params': ['start_date', 'end_date', 'scores_file', 'min_occurrences'],
+        'after': [],
+        'inputs': [PAYROLL_FILE],
+        'tables': ['event_data', 'batter_stats', 'pitcher_stats', 'game_results', 'team_stats', 'player_team_stints'],
+        'files': []
+    },
+    'graph': {
+        'run': create_graph,
+        'params': [],
+        'after': ['import'],
+        'inputs': [],
+        'tables': [],
+        'files': [GRAPH_DIR]
+    },
+    'pagerank': {
+        'run': run_pagerank,
+        'params': ['alpha', 'as_of_date', 'half_life_days'],
+        'after': ['graph'],
+        'inputs': [],
+        'tables': ['combined_player_stats', 'updated_team_stats'],
+        'files': ['updated_network.pickle']
+    },
+    'visualization': {
+        'run': draw_network,
+        'params': ['top_k'],
+        'after': ['pagerank'],
+        'inputs': [],
+        'tables': [],
+        'files': [OUTPUT_FILE]
+    }
+}
+
+DEFAULT_TARGETS = ['import', 'graph', 'pagerank']
+
+
+def load_pipeline_state(state_file=PIPELINE_STATE_FILE):
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as f:
+        return json.load(f)
+
+
+def save_pipeline_state(state, state_file=PIPELINE_STATE_FILE):
+    with open(state_file, 'w') as f:
+        json.dump(state, f, indent=4)
+
+
+# The value hashed for a parameter; the scoring table is hashed by content so editing the file re-runs the import
+def parameter_fingerprint(name, value):
+    if name == 'scores_file':
+        return load_event_scores(value)
+    return value
+
+
+# The module defining a stage and every project module it imports, directly or through other project modules
+def project_modules(module_file):
+    modules = {}
+    pending = [module_file]
+    while pending:
+        path = pending.pop()
+        if path in modules:
+            continue
+        with open(path) as f:
+            modules[path] = f.read()
+        for node in ast.walk(ast.parse(modules[path])):
+            if isinstance(node, ast.Import):
+                imported = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                imported = [node.module]
+            else:
+                continue
+            imported_files = [os.path.join(PROJECT_DIR, f'{name}.py') for name in imported]
+            pending.extend(imported_file for imported_file in imported_files if os.path.exists(imported_file))
+    return modules
+
+
+def file_hash(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Hash of everything a stage's outputs depend on: its parameters, its input files, the code of its module and the
+# project modules it imports (e.g. Sparse_PageRank.py for the pagerank stage), and the keys of the stages it reads
+def stage_key(name, params, upstream_keys):
+    stage = STAGES[name]
+    modules = project_modules(inspect.getsourcefile(stage['run']))
+    fingerprint = {
+        'stage': name,
+        'params': {param: parameter_fingerprint(param, params[param]) for param in stage['params']},
+        'inputs': {path: file_hash(path) for path in stage['inputs']},
+        'code': {os.path.basename(path): hashlib.sha256(source.encode()).hexdigest()
+                 for path, source in modules.items()},
+        'upstream': [upstream_keys[upstream] for upstream in stage['after']]
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def outputs_exist(name):
+    stage = STAGES[name]
+    return all(table_exists(table) for table in stage['tables']) and all(os.path.exists(f) for f in stage['files'])
+
+
+# The targets plus every stage they read from, in run order
+def required_stages(targets):
+    required = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in required:
+            required.add(name)
+            pending.extend(STAGES[name]['after'])
+    return [name for name in STAGES if name in required]
+
+
+# Run the stages needed for the targets, skipping every stage whose key matches its last run and whose outputs exist.
+# Every stage run is timed, and the run report lists the stages that ran and the ones that were skipped
+def run_pipeline(targets=DEFAULT_TARGETS, params=None, force=False):
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    state = load_pipeline_state()
+    keys = {}
+    skipped = []
+    reset_run()
+    stages = required_stages(targets)
+    for position, name in enumerate(stages, start=1):
+        keys[name] = stage_key(name, params, keys)
+        if not force and state.get(name) == keys[name] and outputs_exist(name):
+            print(f"[{position}/{len(stages)}] Skipping {name}: outputs are up to date")
+            skipped.append(name)
+            continue
+
+        print(f"[{position}/{len(stages)}] Running {name}")
+        with stage(name):
+            STAGES[name]['run'](**{param: params[param] for param in STAGES[name]['params']})
+        state[name] = keys[name]
+        save_pipeline_state(state)
+
+    write_run_report(params=params, keys=keys, skipped=skipped)
+    return keys
+
+
+if __name__ == '__main__':
+    # python Pipeline.py [stage ...] [param=value ...] [--force] [--profile], e.g. python Pipeline.py alpha=0.9
+    arguments = sys.argv[1:]
+    targets = [argument for argument in arguments if argument in STAGES] or DEFAULT_TARGETS
+    overrides = {}
+    for argument in arguments:
+        if '=' in argument:
+            name, value = argument.split('=', 1)
+            try:
+                overrides[name] = json.loads(value)
+            except json.JSONDecodeError:
+                overrides[name] = value
+    with profiled(enabled='--profile' in arguments):
+        run_pipeline(targets, overrides, force='--force' in arguments)
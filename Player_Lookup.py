@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+import pybaseball as py
+import unidecode
+
+# On-disk cache of MLBAM id -> name so reruns only look up players that have not been seen before
+PLAYER_CACHE_FILE = 'player_cache.csv'
+
+# AAV assigned to players missing from the payroll file (league minimum)
+DEFAULT_AAV = 720000
+
+
+# Function to normalize names by stripping spaces, converting to upper case and removing accents
+def normalize_name(name):
+    return unidecode.unidecode(name.strip().upper())
+
+
+# Load the cached player names as a dictionary of player_id -> (last name, first name)
+def load_player_cache(cache_file=PLAYER_CACHE_FILE):
+    if not os.path.exists(cache_file):
+        return {}
+    cached = pd.read_csv(cache_file, keep_default_na=False)
+    return {int(row.player_id): (row.name_last, row.name_first) for row in cached.itertuples(index=False)}
+
+
+def save_player_cache(cache, cache_file=PLAYER_CACHE_FILE):
+    cached = pd.DataFrame(
+        [(player_id, last, first) for player_id, (last, first) in cache.items()],
+        columns=['player_id', 'name_last', 'name_first']
+    )
+    cached.to_csv(cache_file, index=False)
+
+
+# Look up names for all players at once, only querying pybaseball for ids missing from the cache
+def lookup_player_names(player_ids, cache_file=PLAYER_CACHE_FILE):
+    cache = load_player_cache(cache_file)
+    missing = [int(player_id) for player_id in player_ids if int(player_id) not in cache]
+
+    if missing:
+        player_info = py.playerid_reverse_lookup(missing, key_type='mlbam')
+        for row in player_info.itertuples(index=False):
+            cache[int(row.key_mlbam)] = (row.name_last, row.name_first)
+        save_player_cache(cache, cache_file)
+
+    # Players the lookup could not resolve are not cached so they are retried on the next run
+    names = {}
+    for player_id in player_ids:
+        last_name, first_name = cache.get(int(player_id), ('Unknown', ''))
+        names[player_id] = f"{last_name}, {first_name}"
+    return names
+
+
+# Build a normalized name -> AAV index from the payroll file, keeping the first entry for duplicate names
+def build_payroll_index(payroll_file):
+    payroll_data = pd.read_csv(payroll_file)
+    aav_index = {}
+    for name, aav in zip(payroll_data['name'], payroll_data['aav']):
+        normalized_name = normalize_name(name)
+        if normalized_name not in aav_index:
+            aav_index[normalized_name] = float(aav.replace('$', '').replace(',', ''))  # Remove dollar sign and commas
+    return aav_index
+
+
+# Resolve names and AAV for every player in one batch
+def resolve_players(player_ids, payroll_file, cache_file=PLAYER_CACHE_FILE):
+    names = lookup_player_names(player_ids, cache_file)
+    aav_index = build_payroll_index(payroll_file)
+
+    players = []
+    missing_aav = []
+    for player_id in player_ids:
+        name = names[player_id]
+        normalized_name = normalize_name(name)
+        aav_value = aav_index.get(normalized_name)
+        if aav_value is None:
+            missing_aav.append(normalized_name)
+            aav_value = DEFAULT_AAV  # Set default AAV if player not found
+        players.append({'player_id': player_id, 'name': name, 'normalized_name': normalized_name, 'aav': aav_value})
+
+    # One summary line instead of a line per player
+    if missing_aav:
+        print(f"No AAV found for {len(missing_aav)} of {len(players)} players, using {DEFAULT_AAV:,}: "
+              f"{', '.join(missing_aav[:5])}{', ...' if len(missing_aav) > 5 else ''}")
+
+    return pd.DataFrame(players, columns=['player_id', 'name', 'normalized_name', 'aav'])
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from Storage import read_table
+
+# Players need at least this many events to be kept in the saved outputs
+MIN_OCCURRENCES = 100
+
+# Event columns produced by the scoring step, mapped to the cumulative stat they feed for each role
+STAT_COLUMNS = {
+    'batter': {'batter_wpa': 'cumulative_wpa', 'batter_delta_re': 'cumulative_re', 'batter_score': 'cumulative_score'},
+    'pitcher': {'pitcher_wpa': 'cumulative_wpa', 'pitcher_delta_re': 'cumulative_re', 'pitcher_score': 'cumulative_score'}
+}
+
+
+# Sum the event stats of every player in one grouped pass and add them to the stats dataframe
+def accumulate_player_stats(df, stats_df, role):
+    columns = STAT_COLUMNS[role]
+    totals = df.groupby(role)[list(columns)].sum().rename(columns=columns)
+
+    stats_df = stats_df.copy()
+    for column in columns.values():
+        added = stats_df['player_id'].map(totals[column]).fillna(0)
+        stats_df[column] = stats_df[column].astype(float) + added.values
+    return stats_df
+
+
+# Original row-by-row accumulation, kept as the reference for the parity check
+def accumulate_player_stats_loop(df, batter_stats_df, pitcher_stats_df):
+    batter_stats_df = batter_stats_df.copy()
+    pitcher_stats_df = pitcher_stats_df.copy()
+    for column in STAT_COLUMNS['batter'].values():
+        batter_stats_df[column] = batter_stats_df[column].astype(float)
+        pitcher_stats_df[column] = pitcher_stats_df[column].astype(float)
+
+    for _, row in df.iterrows():
+        batter_id = row['batter']
+        pitcher_id = row['pitcher']
+
+        batter_stats_df.loc[batter_stats_df['player_id'] == batter_id, 'cumulative_wpa'] += row['batter_wpa']
+        batter_stats_df.loc[batter_stats_df['player_id'] == batter_id, 'cumulative_re'] += row['batter_delta_re']
+        batter_stats_df.loc[batter_stats_df['player_id'] == batter_id, 'cumulative_score'] += row['batter_score']
+
+        pitcher_stats_df.loc[pitcher_stats_df['player_id'] == pitcher_id, 'cumulative_wpa'] += row['pitcher_wpa']
+        pitcher_stats_df.loc[pitcher_stats_df['player_id'] == pitcher_id, 'cumulative_re'] += row['pitcher_delta_re']
+        pitcher_stats_df.loc[pitcher_stats_df['player_id'] == pitcher_id, 'cumulative_score'] += row['pitcher_score']
+
+    return batter_stats_df, pitcher_stats_df
+
+
+# Compare the grouped accumulation against the row loop on a random sample of events
+def check_parity(df, batter_stats_df, pitcher_stats_df, sample_size=500, seed=0):
+    sample = df.sample(n=min(sample_size, len(df)), random_state=seed)
+
+    loop_batters, loop_pitchers = accumulate_player_stats_loop(sample, batter_stats_df, pitcher_stats_df)
+    grouped_batters = accumulate_player_stats(sample, batter_stats_df, 'batter')
+    grouped_pitchers = accumulate_player_stats(sample, pitcher_stats_df, 'pitcher')
+
+    matches = True
+    for role, loop_df, grouped_df in [('batter', loop_batters, grouped_batters),
+                                      ('pitcher', loop_pitchers, grouped_pitchers)]:
+        for column in STAT_COLUMNS[role].values():
+            expected = loop_df[column].astype(float).values
+            actual = grouped_df[column].astype(float).values
+            mismatched = ~np.isclose(expected, actual, equal_nan=True)
+            if mismatched.any():
+                matches = False
+                print(f"Parity mismatch: {mismatched.sum()} {role}s differ on {column}")
+    return matches
+
+
+if __name__ == '__main__':
+    # Run the parity check against the saved event data from Import.py
+    stat_columns = [*STAT_COLUMNS['batter'], *STAT_COLUMNS['pitcher']]
+    event_data = read_table('event_data', columns=['batter', 'pitcher', *stat_columns])
+    empty_stats = {'cumulative_wpa': 0.0, 'cumulative_re': 0.0, 'cumulative_score': 0.0}
+    batters = pd.DataFrame({'player_id': event_data['batter'].unique(), **empty_stats})
+    pitchers = pd.DataFrame({'player_id': event_data['pitcher'].unique(), **empty_stats})
+
+    if check_parity(event_data, batters, pitchers):
+        print("Grouped accumulation matches the row loop.")
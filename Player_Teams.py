@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+
+# Map every event to its batting and fielding team (the away team bats in the top of the inning)
+def assign_event_teams(df):
+    top = (df['inning_topbot'] == 'Top').values
+    batting_team = np.where(top, df['away_team'].values, df['home_team'].values)
+    fielding_team = np.where(top, df['home_team'].values, df['away_team'].values)
+    return batting_team, fielding_team
+
+
+# Group every player's appearances into date-ordered stints, one row per consecutive run with a team
+def get_team_stints(df):
+    batting_team, fielding_team = assign_event_teams(df)
+    appearances = pd.concat([
+        pd.DataFrame({'player_id': df['batter'].values, 'team': batting_team,
+                      'game_date': df['game_date'].values, 'game_pk': df['game_pk'].values}),
+        pd.DataFrame({'player_id': df['pitcher'].values, 'team': fielding_team,
+                      'game_date': df['game_date'].values, 'game_pk': df['game_pk'].values})
+    ], ignore_index=True)
+
+    # One row per player, game and team, in the order the games were played
+    games = appearances.groupby(['player_id', 'game_date', 'game_pk', 'team']).size().reset_index(name='events')
+
+    # A new stint starts whenever the player or their team changes from the previous game
+    new_stint = (games['player_id'] != games['player_id'].shift()) | (games['team'] != games['team'].shift())
+    games['stint'] = new_stint.cumsum()
+
+    stints = games.groupby('stint').agg(
+        player_id=('player_id', 'first'),
+        team=('team', 'first'),
+        start_date=('game_date', 'min'),
+        end_date=('game_date', 'max'),
+        games=('game_pk', 'nunique'),
+        events=('events', 'sum')
+    )
+    return stints.reset_index(drop=True)
+
+
+# Each player's current team, taken from their most recent stint
+def get_player_teams(stints):
+    return stints.drop_duplicates('player_id', keep='last').set_index('player_id')['team']
+
+
+# Append newly computed stints, extending a player's last stint when they are still with the same team
+def merge_team_stints(previous, latest):
+    combined = pd.concat([previous, latest], ignore_index=True).sort_values(['player_id', 'start_date'], kind='stable')
+    new_stint = (combined['player_id'] != combined['player_id'].shift()) | (combined['team'] != combined['team'].shift())
+
+    stints = combined.groupby(new_stint.cumsum().values).agg(
+        player_id=('player_id', 'first'),
+        team=('team', 'first'),
+        start_date=('start_date', 'min'),
+        end_date=('end_date', 'max'),
+        games=('games', 'sum'),
+        events=('events', 'sum')
+    )
+    return stints.reset_index(drop=True)
@@ -0,0 +1,170 @@
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from Matchup_Graph import GRAPH_DIR, METRICS, load_matchup_graph, node_index
+from Player_Lookup import normalize_name
+from Storage import DATA_DIR, read_table
+
+# Address the local HTTP endpoint listens on
+HOST = '127.0.0.1'
+PORT = 8050
+
+# Results returned by top-k queries when no k is given
+DEFAULT_K = 20
+
+
+# Load the rankings saved by PageRank.py and memory-map the graph saved by Create_Graph.py, building every
+# index once so queries only do dictionary lookups and small array scans
+def load_store(data_dir=DATA_DIR, graph_dir=GRAPH_DIR):
+    players = read_table('combined_player_stats', data_dir=data_dir).reset_index(drop=True)
+    records = players.astype(object).where(players.notna(), None).to_dict(orient='records')
+    graph = load_matchup_graph(graph_dir)
+
+    names = [normalize_name(name) for name in players['name']]
+    by_name = {}
+    for position, name in enumerate(names):
+        by_name.setdefault(name, []).append(position)
+
+    return {
+        'records': records,
+        'by_id': {int(player_id): position for position, player_id in enumerate(players['player_id'])},
+        'names': names,
+        'by_name': by_name,
+        'teams': players['team'].values,
+        'roles': players['role'].values,
+        # Player positions ordered by each PageRank column, highest first
+        'ranked': {metric: np.argsort(-players[f'pagerank_{metric}'].fillna(0).values, kind='stable')
+                   for metric in METRICS},
+        'graph': graph,
+        'graph_index': node_index(graph).to_dict(),
+        # Transposed copies give each player's incoming edges without scanning the columns of the CSR arrays
+        'incoming': {metric: graph[metric].T.tocsr() for metric in METRICS}
+    }
+
+
+def player(store, player_id):
+    position = store['by_id'].get(int(player_id))
+    return None if position is None else store['records'][position]
+
+
+# Players whose normalized "LAST, FIRST" name matches exactly, or else contains the query
+def find_players(store, name):
+    query = normalize_name(name)
+    positions = store['by_name'].get(query)
+    if positions is None:
+        positions = [position for position, player_name in enumerate(store['names']) if query in player_name]
+    return [store['records'][position] for position in positions]
+
+
+# The k highest-ranked players for a metric, optionally only batters or pitchers and only one team
+def top_players(store, metric='wpa', k=DEFAULT_K, role=None, team=None):
+    ranked = store['ranked'][metric]
+    keep = np.ones(len(ranked), dtype=bool)
+    if role is not None:
+        keep &= store['roles'] == role
+    if team is not None:
+        keep &= store['teams'] == team
+    return [store['records'][position] for position in ranked[keep[ranked]][:k]]
+
+
+def team_players(store, team, metric='wpa'):
+    return top_players(store, metric, k=None, team=team)
+
+
+# Weight of one edge, found by binary search in the row's sorted column indices
+def edge_weight(matrix, row, col):
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    position = start + np.searchsorted(matrix.indices[start:end], col)
+    if position < end and matrix.indices[position] == col:
+        return float(matrix.data[position])
+    return 0.0
+
+
+# Matchup totals for a batter-pitcher pair from the batter's point of view; edges point towards the player who
+# came out ahead, so the pair's single edge is either pitcher -> batter (positive) or batter -> pitcher (negative)
+def matchup(store, batter_id, pitcher_id):
+    batter = store['graph_index'].get(int(batter_id))
+    pitcher = store['graph_index'].get(int(pitcher_id))
+    if batter is None or pitcher is None:
+        return None
+
+    totals = {'batter': int(batter_id), 'pitcher': int(pitcher_id)}
+    for metric in METRICS:
+        matrix = store['graph'][metric]
+        totals[metric] = edge_weight(matrix, pitcher, batter) + edge_weight(matrix, batter, pitcher)
+    return totals
+
+
+# A player's k largest matchups by absolute total, each from the player's point of view
+def player_matchups(store, player_id, metric='wpa', k=DEFAULT_K):
+    position = store['graph_index'].get(int(player_id))
+    if position is None:
+        return []
+
+    outgoing = store['graph'][metric]
+    incoming = store['incoming'][metric]
+    # Edges point towards the player who came out ahead: incoming edges are matchups the player won
+    opponents = np.concatenate([outgoing.indices[outgoing.indptr[position]:outgoing.indptr[position + 1]],
+                                incoming.indices[incoming.indptr[position]:incoming.indptr[position + 1]]])
+    totals = np.concatenate([-np.abs(outgoing.data[outgoing.indptr[position]:outgoing.indptr[position + 1]]),
+                             np.abs(incoming.data[incoming.indptr[position]:incoming.indptr[position + 1]])])
+
+    node_ids = store['graph']['node_ids']
+    order = np.argsort(-np.abs(totals), kind='stable')[:k]
+    return [{'opponent': int(node_ids[opponents[i]]), metric: float(totals[i])} for i in order]
+
+
+# Routes of the HTTP endpoint, each answering from the store loaded at startup:
+#   /player/<id>, /players?name=, /top?metric=&k=&role=&team=, /team/<team>?metric=,
+#   /matchup?batter=&pitcher=, /matchups/<id>?metric=&k=
+def handle_query(store, path, params):
+    parts = [part for part in path.split('/') if part]
+    metric = params.get('metric', 'wpa')
+    k = int(params['k']) if 'k' in params else DEFAULT_K
+    if parts[:1] == ['player'] and len(parts) == 2:
+        return player(store, parts[1])
+    if parts == ['players'] and 'name' in params:
+        return find_players(store, params['name'])
+    if parts == ['top']:
+        return top_players(store, metric, k, params.get('role'), params.get('team'))
+    if parts[:1] == ['team'] and len(parts) == 2:
+        return team_players(store, parts[1], metric)
+    if parts == ['matchup'] and 'batter' in params and 'pitcher' in params:
+        return matchup(store, params['batter'], params['pitcher'])
+    if parts[:1] == ['matchups'] and len(parts) == 2:
+        return player_matchups(store, parts[1], metric, k)
+    raise KeyError(path)
+
+
+def serve(store, host=HOST, port=PORT):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                result = handle_query(store, url.path, params)
+                status = 200 if result is not None else 404
+            except (KeyError, ValueError) as error:
+                result, status = {'error': f"Unknown query: {error}"}, 400
+
+            body = json.dumps(result).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Serving rankings on http://{host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    # python Query_Service.py [port], e.g. curl 'http://127.0.0.1:8050/top?metric=re&role=batter&team=NYY'
+    serve(load_store(), port=int(sys.argv[1]) if len(sys.argv) > 1 else PORT)
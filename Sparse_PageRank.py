@@ -0,0 +1,123 @@
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from Matchup_Graph import METRICS, load_matchup_graph
+
+ALPHA = 0.85
+TOLERANCE = 1.0e-6
+MAX_ITER = 10000
+
+
+# Normalize the absolute edge weights of one statistic so every player's outgoing weights sum to 1
+def transition_matrix(graph, weight_key):
+    weights = abs(graph[weight_key]).tocsr()
+    total_weight = np.asarray(weights.sum(axis=1)).ravel()
+    dangling = total_weight == 0
+    total_weight[dangling] = 1
+    transition = (sparse.diags(1 / total_weight) @ weights).tocsr()
+
+    # Only players with an edge for this statistic take part in its ranking
+    active = ~dangling | (np.asarray(weights.sum(axis=0)).ravel() > 0)
+    return transition, dangling, active
+
+
+# Uniform teleport distribution over the active players of each column
+def uniform_personalization(active):
+    counts = active.sum(axis=0)
+    return active / np.where(counts > 0, counts, 1)
+
+
+# Power iteration for several PageRank vectors at once, one per column of `personalization`.
+# `transitions` is either one sparse matrix shared by every column or a list with one matrix per column;
+# mass on dangling players is redistributed following each column's personalization, as nx.pagerank does.
+# A warm `start` (e.g. a previous solution) is renormalized onto each column's players before iterating.
+def power_iteration(transitions, dangling, personalization, alpha=ALPHA, tol=TOLERANCE, max_iter=MAX_ITER,
+                    start=None):
+    size, columns = personalization.shape
+    if size == 0:
+        return np.zeros((size, columns)), 0
+    shared = sparse.issparse(transitions)
+    if shared:
+        transposed = transitions.T.tocsr()
+    else:
+        # Stack the per-column matrices block-diagonally so each iteration is a single sparse product
+        transposed = sparse.block_diag([transition.T for transition in transitions], format='csr')
+    dangling = np.asarray(dangling, dtype=float).reshape(size, -1)
+    support = personalization > 0
+
+    if start is None:
+        x = personalization.copy()
+    else:
+        x = np.where(support, start, 0.0)
+        totals = x.sum(axis=0)
+        x = np.where(totals > 0, x / np.where(totals > 0, totals, 1), personalization)
+
+    # Same stopping rule as nx.pagerank: L1 change below tol times the number of players ranked.
+    # Columns without any players (a metric with no edges) stay at 0 and count as converged
+    threshold = tol * support.sum(axis=0)
+    empty = ~support.any(axis=0)
+    for iteration in range(1, max_iter + 1):
+        x_last = x
+        if shared:
+            spread = transposed @ x_last
+        else:
+            spread = (transposed @ x_last.ravel(order='F')).reshape(size, columns, order='F')
+        dangling_mass = (x_last * dangling).sum(axis=0)
+        x = alpha * (spread + dangling_mass * personalization) + (1 - alpha) * personalization
+        if ((np.abs(x - x_last).sum(axis=0) < threshold) | empty).all():
+            return x, iteration
+
+    raise RuntimeError(f"PageRank failed to converge in {max_iter} iterations")
+
+
+# Rank every player for each metric in one batched solve; players without edges for a metric get 0.
+# `start` may be the ranks of a previous solve, used as a warm start
+def rank_metrics(graph, metrics=tuple(METRICS), alpha=ALPHA, tol=TOLERANCE, max_iter=MAX_ITER, start=None):
+    transitions, dangling, active = zip(*(transition_matrix(graph, metric) for metric in metrics))
+    personalization = uniform_personalization(np.column_stack(active))
+    columns = [f'pagerank_{metric}' for metric in metrics]
+    if start is not None:
+        # Players new to the graph start at 0 and pick up mass from the teleport term
+        start = start.reindex(index=graph['node_ids'], columns=columns).fillna(0).values
+
+    x, iterations = power_iteration(list(transitions), np.column_stack(dangling), personalization, alpha, tol,
+                                    max_iter, start)
+    ranks = pd.DataFrame(x, index=np.asarray(graph['node_ids']), columns=columns)
+    return ranks, iterations
+
+
+# Function to normalize and consolidate edge weights for a specific statistic into a NetworkX graph
+def normalize_and_consolidate_for_stat(graph, weight_key):
+    normalized = transition_matrix(graph, weight_key)[0].tocoo()
+    node_ids = np.asarray(graph['node_ids'])
+    G_normalized = nx.DiGraph()
+    G_normalized.add_weighted_edges_from(
+        (int(u), int(v), weight) for u, v, weight in zip(node_ids[normalized.row], node_ids[normalized.col],
+                                                          normalized.data))
+    return G_normalized
+
+
+# Largest absolute difference per metric between the batched solve and nx.pagerank
+def validate_against_networkx(graph, ranks, alpha=ALPHA):
+    differences = {}
+    for metric in METRICS:
+        expected = pd.Series(nx.pagerank(normalize_and_consolidate_for_stat(graph, metric), alpha=alpha,
+                                         weight='weight', max_iter=MAX_ITER))
+        actual = ranks[f'pagerank_{metric}']
+        differences[metric] = (actual.reindex(expected.index) - expected).abs().max()
+    return differences
+
+
+if __name__ == '__main__':
+    # Compare the batched solve with nx.pagerank on the saved graph
+    graph = load_matchup_graph()
+    start_time = time.perf_counter()
+    ranks, iterations = rank_metrics(graph)
+    elapsed = time.perf_counter() - start_time
+    print(f"Ranked {len(ranks)} players on {len(METRICS)} metrics in {iterations} iterations "
+          f"({elapsed * 1000:.1f} ms)")
+    for metric, difference in validate_against_networkx(graph, ranks).items():
+        print(f"{metric}: max difference from nx.pagerank {difference:.2e}")
@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pybaseball as py
+from Event_Store import (REQUIRED_COLUMNS, load_ingested_dates, project_events, read_event_store,
+                         save_ingested_dates, write_event_partitions)
+from Synthetic_Data import GAMES_PER_SEASON, generate_events
+
+# Projected events of every date fetched so far, one partition per game date, shared by every import and window
+RAW_CACHE_DIR = 'raw_cache'
+
+# Days per statcast call, and the calls in flight at once
+CHUNK_DAYS = 1
+MAX_WORKERS = 4
+
+# Attempts per chunk after the first one, waiting BACKOFF_SECONDS, then twice as long, and so on
+RETRIES = 3
+BACKOFF_SECONDS = 2
+
+
+# Split the dates into chunks of at most chunk_days consecutive dates
+def consecutive_chunks(dates, chunk_days=CHUNK_DAYS):
+    chunks = []
+    for date in sorted(dates):
+        if (chunks and len(chunks[-1]) < chunk_days and
+                pd.Timestamp(date) - pd.Timestamp(chunks[-1][-1]) == pd.Timedelta(days=1)):
+            chunks[-1].append(date)
+        else:
+            chunks.append([date])
+    return chunks
+
+
+# Fetch one chunk from the source, retrying with exponential backoff
+def fetch_chunk(source, dates, retries=RETRIES, backoff_seconds=BACKOFF_SECONDS):
+    for attempt in range(retries + 1):
+        try:
+            data = source(dates[0], dates[-1])
+            return pd.DataFrame(columns=REQUIRED_COLUMNS) if data is None or data.empty else project_events(data)
+        except Exception as error:
+            if attempt == retries:
+                raise
+            print(f"Fetching {dates[0]} to {dates[-1]} failed ({error}), retrying in "
+                  f"{backoff_seconds * 2 ** attempt} s")
+            time.sleep(backoff_seconds * 2 ** attempt)
+
+
+# Fetch every date of the range missing from the raw cache, chunk_days at a time with up to max_workers chunks in
+# flight, and return the range's events from the cache. Each chunk is cached as soon as it arrives, so a failed
+# chunk only has to be fetched again on the next run
+def fetch_range(start_date, end_date, source=None, cache_dir=RAW_CACHE_DIR, chunk_days=CHUNK_DAYS,
+                max_workers=MAX_WORKERS, retries=RETRIES, backoff_seconds=BACKOFF_SECONDS, columns=REQUIRED_COLUMNS):
+    source = source or py.statcast
+    today = pd.Timestamp.today().strftime('%Y-%m-%d')
+    ingested_dates = load_ingested_dates(cache_dir)
+    dates = [date.strftime('%Y-%m-%d') for date in pd.date_range(start_date, end_date)]
+    chunks = consecutive_chunks([date for date in dates if date not in ingested_dates], chunk_days)
+
+    failed = []
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_chunk, source, chunk, retries, backoff_seconds): chunk
+                       for chunk in chunks}
+            # Results are written from this thread only, as each chunk completes
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    events = future.result()
+                except Exception as error:
+                    print(f"Fetching {chunk[0]} to {chunk[-1]} failed after {retries + 1} attempts: {error}")
+                    failed.append(chunk)
+                    continue
+                if not events.empty:
+                    write_event_partitions(events, cache_dir)
+                # Today's games may still be in progress, so only dates before today count as fetched
+                ingested_dates |= {date for date in chunk if date < today}
+                save_ingested_dates(ingested_dates, cache_dir)
+
+    if failed:
+        failed_dates = ', '.join(f'{chunk[0]} to {chunk[-1]}' for chunk in sorted(failed))
+        raise RuntimeError(f"Could not fetch {failed_dates}; the other dates are cached, rerun to fetch the rest")
+    return read_event_store(cache_dir, columns=columns, start_date=start_date, end_date=end_date)
+
+
+# Offline stand-in for py.statcast serving synthetic events for the seasons it is asked about;
+# a failure_rate above 0 makes calls fail at random to exercise the retries
+def synthetic_source(seed=0, failure_rate=0.0):
+    seasons = {}
+    rng = np.random.default_rng(seed)
+    lock = threading.Lock()
+
+    def source(start_date, end_date):
+        year = int(start_date[:4])
+        with lock:
+            if rng.random() < failure_rate:
+                raise ConnectionError("synthetic source failure")
+            if year not in seasons:
+                seasons[year] = generate_events(GAMES_PER_SEASON, seed=seed + year, first_season=year)
+        events = seasons[year]
+        return events[(events['game_date'] >= start_date) & (events['game_date'] <= end_date)]
+
+    return source
+
+
+if __name__ == '__main__':
+    # Fill the raw cache for a range: python Statcast_Fetch.py 2023-03-30 2023-10-01 [--offline]
+    start_date, end_date = sys.argv[1], sys.argv[2]
+    if '--offline' in sys.argv:
+        source = synthetic_source()
+    else:
+        py.cache.enable()
+        source = py.statcast
+    start_time = time.perf_counter()
+    events = fetch_range(start_date, end_date, source)
+    print(f"{len(events)} events from {start_date} to {end_date} in {time.perf_counter() - start_time:.1f} s")
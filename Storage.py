@@ -0,0 +1,50 @@
+import os
+import shutil
+
+import pandas as pd
+
+# Directory holding the tables handed from one stage to the next
+DATA_DIR = 'data'
+COMPRESSION = 'zstd'
+
+
+def table_path(name, data_dir=DATA_DIR, partitioned=False):
+    return os.path.join(data_dir, name if partitioned else f'{name}.parquet')
+
+
+def table_exists(name, data_dir=DATA_DIR):
+    return os.path.exists(table_path(name, data_dir)) or os.path.isdir(table_path(name, data_dir, partitioned=True))
+
+
+# Write a table as compressed Parquet; partitioned tables get one directory per partition value,
+# and rewriting a partition replaces it instead of appending to it. With overwrite=True every existing
+# partition is removed first, so the table holds exactly df instead of df plus the partitions of earlier runs
+def write_table(df, name, data_dir=DATA_DIR, partition_cols=None, overwrite=False):
+    os.makedirs(data_dir, exist_ok=True)
+    partitioned_path = table_path(name, data_dir, partitioned=True)
+    if partition_cols and overwrite and os.path.isdir(partitioned_path):
+        shutil.rmtree(partitioned_path)
+    if partition_cols and not df.empty:
+        # Drop the empty single-file table an earlier empty write may have left
+        if os.path.exists(table_path(name, data_dir)):
+            os.remove(table_path(name, data_dir))
+        df.to_parquet(partitioned_path, partition_cols=partition_cols, compression=COMPRESSION, index=False,
+                      existing_data_behavior='delete_matching')
+    elif not partition_cols or overwrite or not table_exists(name, data_dir):
+        # An empty frame has no partitions to write, so it is saved as a single file that reads back as an
+        # empty frame with the table's columns
+        df.to_parquet(table_path(name, data_dir), compression=COMPRESSION, index=False)
+
+
+# Read a table, loading only the requested columns and only the row groups or partitions matching the filters
+def read_table(name, columns=None, filters=None, data_dir=DATA_DIR):
+    partitioned_path = table_path(name, data_dir, partitioned=True)
+    if not os.path.isdir(partitioned_path):
+        return pd.read_parquet(table_path(name, data_dir), columns=columns, filters=filters)
+
+    df = pd.read_parquet(partitioned_path, columns=columns, filters=filters)
+    # Partition values come back as categories; restore them to the plain strings they were written as
+    partition_cols = {entry.split('=')[0] for entry in os.listdir(partitioned_path) if '=' in entry}
+    for column in partition_cols & set(df.columns):
+        df[column] = df[column].astype(str)
+    return df
@@ -0,0 +1,99 @@
+import sys
+
+import numpy as np
+import pandas as pd
+from Event_Store import REQUIRED_COLUMNS
+
+# Games per scale: one month, one regular season and five seasons of 2,430 games
+SCALES = {'month': 405, 'season': 2430, 'five_seasons': 12150}
+
+GAMES_PER_SEASON = 2430
+GAMES_PER_DAY = 15
+TEAMS = ['ATL', 'AZ', 'BAL', 'BOS', 'CHC', 'CIN', 'CLE', 'COL', 'CWS', 'DET', 'HOU', 'KC', 'LAA', 'LAD', 'MIA',
+         'MIL', 'MIN', 'NYM', 'NYY', 'OAK', 'PHI', 'PIT', 'SD', 'SEA', 'SF', 'STL', 'TB', 'TEX', 'TOR', 'WSH']
+
+# Roster slots per team and the number of them filled by new players every season
+BATTERS_PER_TEAM = 22
+PITCHERS_PER_TEAM = 28
+NEW_PLAYERS_PER_SEASON = 5
+
+# Plate appearances per game and per half inning
+EVENTS_PER_GAME = (70, 84)
+EVENTS_PER_HALF_INNING = 4
+
+# Outcome frequencies, roughly those of a Statcast season
+EVENT_FREQUENCIES = {
+    'field_out': 0.44, 'strikeout': 0.22, 'single': 0.14, 'walk': 0.08, 'double': 0.045, 'home_run': 0.03,
+    'hit_by_pitch': 0.01, 'force_out': 0.01, 'grounded_into_double_play': 0.01, 'sac_fly': 0.005,
+    'field_error': 0.004, 'triple': 0.003, 'fielders_choice_out': 0.002, 'sac_bunt': 0.001
+}
+
+# Runs scored on each kind of outcome
+RUNS_PER_EVENT = {'home_run': 1.6, 'triple': 0.9, 'double': 0.6, 'single': 0.35, 'sac_fly': 1.0, 'walk': 0.1}
+
+
+# Player ids for roster slots of a team in a season; a few slots turn over to new players every season
+def roster_ids(base, teams, slots, seasons):
+    return base + teams * 1000 + seasons * NEW_PLAYERS_PER_SEASON + slots
+
+
+# Generate a Statcast-shaped event frame with the REQUIRED_COLUMNS schema, one row per plate appearance outcome
+def generate_events(games, seed=0, first_season=2019):
+    rng = np.random.default_rng(seed)
+
+    # Games are played 15 a day from opening day, each season starting on March 30
+    game_numbers = np.arange(games)
+    seasons = game_numbers // GAMES_PER_SEASON
+    days = (game_numbers % GAMES_PER_SEASON) // GAMES_PER_DAY
+    opening_days = pd.to_datetime([f'{first_season + season}-03-30' for season in range(seasons.max() + 1)])
+    game_dates = (opening_days[seasons] + pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d')
+
+    home = rng.integers(0, len(TEAMS), games)
+    away = (home + rng.integers(1, len(TEAMS), games)) % len(TEAMS)
+
+    # Expand the games into plate appearances
+    events_per_game = rng.integers(EVENTS_PER_GAME[0], EVENTS_PER_GAME[1] + 1, games)
+    game = np.repeat(game_numbers, events_per_game)
+    game_starts = np.cumsum(events_per_game) - events_per_game
+    at_bat_number = np.arange(len(game)) - np.repeat(game_starts, events_per_game) + 1
+    top = ((at_bat_number - 1) // EVENTS_PER_HALF_INNING) % 2 == 0
+    batting_team = np.where(top, away[game], home[game])
+    fielding_team = np.where(top, home[game], away[game])
+
+    size = len(game)
+    events = rng.choice(list(EVENT_FREQUENCIES), size, p=np.array(list(EVENT_FREQUENCIES.values())) /
+                        sum(EVENT_FREQUENCIES.values()))
+    batter = roster_ids(400000, batting_team, rng.integers(0, BATTERS_PER_TEAM, size), seasons[game])
+    pitcher = roster_ids(600000, fielding_team, rng.integers(0, PITCHERS_PER_TEAM, size), seasons[game])
+
+    # Runs follow the outcome, and the running score is kept per game
+    runs = rng.poisson(pd.Series(events).map(RUNS_PER_EVENT).fillna(0).values)
+    post_home_score = pd.Series(np.where(top, 0, runs)).groupby(game).cumsum().values
+    post_away_score = pd.Series(np.where(top, runs, 0)).groupby(game).cumsum().values
+
+    df = pd.DataFrame({
+        'batter': batter.astype(np.int64),
+        'pitcher': pitcher.astype(np.int64),
+        'events': events,
+        'delta_home_win_exp': rng.normal(0, 0.04, size),
+        'delta_run_exp': rng.normal(0, 0.25, size),
+        'inning_topbot': np.where(top, 'Top', 'Bot'),
+        'game_pk': 700000 + game,
+        'game_date': game_dates[game],
+        'home_team': np.array(TEAMS)[home[game]],
+        'away_team': np.array(TEAMS)[away[game]],
+        'at_bat_number': at_bat_number,
+        'pitch_number': rng.integers(1, 7, size),
+        'post_home_score': post_home_score,
+        'post_away_score': post_away_score
+    })
+    return df[REQUIRED_COLUMNS]
+
+
+if __name__ == '__main__':
+    # Print the shape of a generated scale: python Synthetic_Data.py [month|season|five_seasons]
+    scale = sys.argv[1] if len(sys.argv) > 1 else 'month'
+    events = generate_events(SCALES[scale])
+    print(f"{scale}: {len(events)} events, {events['game_pk'].nunique()} games, "
+          f"{events['batter'].nunique()} batters, {events['pitcher'].nunique()} pitchers, "
+          f"{events['game_date'].min()} to {events['game_date'].max()}")
@@ -0,0 +1,87 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pybaseball as py
+from Event_Scoring import EVENT_SCORES_FILE, load_event_scores, score_events
+from Event_Store import REQUIRED_COLUMNS, read_event_store
+from Matchup_Graph import METRICS, aggregate_matchups, build_matchup_graph
+from Player_Lookup import lookup_player_names
+from Player_Stats import MIN_OCCURRENCES, accumulate_player_stats
+from Sparse_PageRank import ALPHA, rank_metrics
+from Statcast_Fetch import RAW_CACHE_DIR, fetch_range
+from Storage import write_table
+
+
+# Windows of `days` days ending every `step` days between the start and end dates, e.g. rolling 30-day windows
+def rolling_windows(start_date, end_date, days=30, step=1):
+    windows = []
+    for window_end in pd.date_range(pd.Timestamp(start_date) + pd.Timedelta(days=days - 1), end_date,
+                                    freq=f'{step}D'):
+        window_start = window_end - pd.Timedelta(days=days - 1)
+        windows.append((window_start.strftime('%Y-%m-%d'), window_end.strftime('%Y-%m-%d')))
+    return windows
+
+
+# Fetch every date the windows need that is not cached yet
+def fill_raw_cache(windows, cache_dir=RAW_CACHE_DIR):
+    for start_date, end_date in windows:
+        fetch_range(start_date, end_date, cache_dir=cache_dir, columns=['game_date'])
+
+
+# Run import -> graph -> PageRank for one date window on the cached events
+def rank_window(window, alpha=ALPHA, min_occurrences=MIN_OCCURRENCES, cache_dir=RAW_CACHE_DIR):
+    start_date, end_date = window
+    events = read_event_store(cache_dir, columns=REQUIRED_COLUMNS, start_date=start_date, end_date=end_date)
+    events = score_events(events, load_event_scores(EVENT_SCORES_FILE))
+
+    # Cumulative stats for the players with enough events in the window
+    role_stats = {}
+    for role in ['batter', 'pitcher']:
+        occurrences = events[role].value_counts()
+        eligible = occurrences[occurrences >= min_occurrences].index
+        stats = pd.DataFrame({'player_id': eligible, 'cumulative_wpa': 0.0, 'cumulative_re': 0.0,
+                              'cumulative_score': 0.0})
+        role_stats[role] = accumulate_player_stats(events, stats, role)
+
+    rankings = pd.concat([stats.assign(role=role) for role, stats in role_stats.items()], ignore_index=True)
+    if rankings.empty:
+        # No player reached min_occurrences, e.g. a short or early-season window: nothing to rank
+        rankings = rankings.assign(**{f'pagerank_{metric}': 0.0 for metric in METRICS})
+    else:
+        events = events[events['batter'].isin(role_stats['batter']['player_id']) &
+                        events['pitcher'].isin(role_stats['pitcher']['player_id'])]
+        graph = build_matchup_graph(role_stats['batter']['player_id'].values,
+                                    role_stats['pitcher']['player_id'].values, aggregate_matchups(events))
+        ranks, iterations = rank_metrics(graph, alpha=alpha)
+        rankings = rankings.join(ranks, on='player_id')
+    rankings.insert(0, 'start_date', start_date)
+    rankings.insert(1, 'end_date', end_date)
+    return rankings
+
+
+# Rank every window across a process pool and consolidate the results into one table
+def run_windows(windows, max_workers=None, alpha=ALPHA, min_occurrences=MIN_OCCURRENCES):
+    fill_raw_cache(windows)
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        results = list(executor.map(rank_window, windows, [alpha] * len(windows),
+                                    [min_occurrences] * len(windows)))
+
+    window_rankings = pd.concat(results, ignore_index=True)
+    names = lookup_player_names(window_rankings['player_id'].unique())
+    window_rankings.insert(2, 'name', window_rankings['player_id'].map(names))
+    write_table(window_rankings, 'window_rankings')
+    return window_rankings
+
+
+if __name__ == '__main__':
+    # Windows as start:end pairs, e.g. python Window_Runner.py 2023-04-01:2023-04-30 2023-05-01:2023-05-31,
+    # or rolling 30-day windows over a range: python Window_Runner.py --rolling 2023-04-01 2023-06-30
+    py.cache.enable()
+    if sys.argv[1:2] == ['--rolling']:
+        windows = rolling_windows(sys.argv[2], sys.argv[3])
+    else:
+        windows = [tuple(argument.split(':')) for argument in sys.argv[1:]]
+    window_rankings = run_windows(windows)
+    print(f"Ranked {len(windows)} windows: {len(window_rankings)} player rankings saved to window_rankings")